@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Modules the model must not pull in on import; numpy is only reported
+GUI_MODULES = ("pygame", "tkinter")
+REPORTED_MODULES = GUI_MODULES + ("numpy",)
+
+# Runs in a fresh interpreter: import the model, build a tiny tree, report
+PROBE = f"""
+import sys, time, json
+sys.path.insert(0, {ROOT!r})
+t0 = time.perf_counter()
+import skill_tree as st
+t1 = time.perf_counter()
+a, b = st.Skill(0, 0), st.Skill(100, 0, "b", 30)
+g = st.SkillGraph()
+paths = []
+for s in (a, b):
+    p = st.Path()
+    p.add_skill(s)
+    paths.append(p)
+st.link_skills(a, b, g, paths)
+print(json.dumps({{"import_ms": (t1 - t0) * 1000,
+                  "loaded": [m for m in {REPORTED_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def probe(env):
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check that importing the model stays cheap and GUI-free.")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=50.0, help="fail if the median import takes longer")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None) # time the import, not compiling the source
+    probe(env) # warm the bytecode cache
+    runs = [probe(env) for _ in range(args.repeat)]
+
+    times = [r["import_ms"] for r in runs]
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    median = statistics.median(times)
+    print(f"import skill_tree  median={median:.1f} ms  min={min(times):.1f} ms  max={max(times):.1f} ms"
+          f"  loaded={', '.join(loaded) or 'none'}")
+
+    gui = [m for m in loaded if m in GUI_MODULES]
+    if gui:
+        print(f"[FAIL] importing the model loaded {', '.join(gui)}")
+        sys.exit(1)
+    if median > args.budget_ms:
+        print(f"[FAIL] median import time {median:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print("[OK] model imports without GUI modules")
+
+
+if __name__ == "__main__":
+    main()
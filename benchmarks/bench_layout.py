@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scaling import GENERATORS, build, st
+
+
+MAX_RADIUS = 60
+
+
+def laid_out(kind, n, seed, zoom):
+    # The same tree each time, with mixed radii, as last drawn at zoom:
+    # Skill.draw leaves the zoomed, pulsing screen radius in s.radius
+    skills, paths, connections = build(kind, n, seed)
+    rng = random.Random(seed)
+    for s in skills:
+        s.original_radius = rng.randint(st.MIN_RADIUS, MAX_RADIUS)
+        s.radius = int(s.original_radius * zoom)
+    t0 = time.perf_counter()
+    st.tree_layout(paths, connections)
+    seconds = time.perf_counter() - t0
+    return [(s.x, s.y) for s in skills], seconds
+
+def overlaps(kind, n, seed, positions):
+    # Pairs of skills in the same layer closer than their radii allow
+    skills, _, _ = build(kind, n, seed)
+    rng = random.Random(seed)
+    radii = [rng.randint(st.MIN_RADIUS, MAX_RADIUS) for _ in skills]
+    layers = {}
+    for (x, y), r in zip(positions, radii):
+        layers.setdefault(round(y, 6), []).append((x, r))
+    count = 0
+    for row in layers.values():
+        row.sort()
+        count += sum(b[0] - a[0] < a[1] + b[1] - 1e-6 for a, b in zip(row, row[1:]))
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time the tidy-tree layout and check it does not depend on the zoom.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--generators", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    ap.add_argument("--zooms", type=float, nargs="+", default=[1.0, 0.22, 3.0])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    failed = 0
+    for n in args.sizes:
+        for kind in args.generators:
+            reference, seconds = laid_out(kind, n, args.seed, args.zooms[0])
+            moved = 0
+            for zoom in args.zooms[1:]:
+                positions, _ = laid_out(kind, n, args.seed, zoom)
+                moved += sum(p != q for p, q in zip(positions, reference))
+            overlapping = overlaps(kind, n, args.seed, reference)
+            print(f"{kind:12s} n={n:7d}  layout={seconds*1000:9.1f} ms  moved by zoom={moved}  overlapping={overlapping}")
+            failed += bool(moved or overlapping)
+
+    if failed:
+        print("[FAIL] the layout depends on the zoom or places skills over each other")
+        sys.exit(1)
+    print("[OK] the layout is the same at every zoom")
+
+
+if __name__ == "__main__":
+    main()
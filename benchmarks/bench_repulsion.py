@@ -0,0 +1,97 @@
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import skill_tree as st
+
+
+REPULSION_STRENGTH = 10000
+REPULSION_RANGE_SQ = 100**2
+
+
+def make_skills(n, spread, seed):
+    rng = random.Random(seed)
+    return [st.Skill(rng.uniform(0, spread), rng.uniform(0, spread)) for _ in range(n)]
+
+def reset(skills):
+    for s in skills:
+        s.vx = 0
+        s.vy = 0
+
+def forces(skills):
+    return [(s.vx, s.vy) for s in skills]
+
+def max_deviation(a, b):
+    return max((math.hypot(ax - bx, ay - by) for (ax, ay), (bx, by) in zip(a, b)), default=0.0)
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_grid(n, seed):
+    # Spread keeps density constant (~4 nodes per repulsion cell)
+    skills = make_skills(n, math.sqrt(n / 4) * 100, seed)
+
+    reset(skills)
+    t_brute = timed(lambda: st.apply_repulsion_brute(skills, REPULSION_STRENGTH, REPULSION_RANGE_SQ))
+    brute = forces(skills)
+
+    reset(skills)
+    grid = st.SpatialHash(math.sqrt(REPULSION_RANGE_SQ))
+    def run_grid():
+        grid.rebuild(skills)
+        st.apply_repulsion_grid(grid, REPULSION_STRENGTH, REPULSION_RANGE_SQ)
+    t_grid = timed(run_grid)
+
+    dev = max_deviation(brute, forces(skills))
+    print(f"grid  n={n:6d}  brute={t_brute*1000:9.1f} ms  grid={t_grid*1000:8.1f} ms  max|dF|={dev:.2e}")
+    return dev
+
+
+def bench_barnes_hut(n, theta, seed):
+    # No cutoff: the exact reference is the all-pairs sum
+    skills = make_skills(n, math.sqrt(n / 4) * 100, seed)
+
+    reset(skills)
+    t_exact = timed(lambda: st.apply_repulsion_brute(skills, REPULSION_STRENGTH, math.inf))
+    exact = forces(skills)
+
+    reset(skills)
+    t_bh = timed(lambda: st.apply_repulsion_barnes_hut(skills, REPULSION_STRENGTH, theta))
+    approx = forces(skills)
+
+    norm = math.sqrt(sum(fx*fx + fy*fy for fx, fy in exact) / n)
+    rms = math.sqrt(sum((ax - bx)**2 + (ay - by)**2 for (ax, ay), (bx, by) in zip(exact, approx)) / n)
+    print(f"bh    n={n:6d}  exact={t_exact*1000:9.1f} ms  bh={t_bh*1000:11.1f} ms  theta={theta:.1f}  rel. RMS error={rms / norm:.2%}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare repulsion strategies against the brute-force pair loop.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tolerance", type=float, default=1e-9)
+    ap.add_argument("--theta", type=float, nargs="+", default=[0.5, 0.7, 1.0])
+    args = ap.parse_args()
+
+    worst = 0.0
+    for n in args.sizes:
+        worst = max(worst, bench_grid(n, args.seed))
+    for n in args.sizes:
+        for theta in args.theta:
+            bench_barnes_hut(n, theta, args.seed)
+
+    if worst > args.tolerance:
+        print(f"[FAIL] grid forces deviate from brute force by {worst:.2e}")
+        sys.exit(1)
+    print("[OK] grid forces match brute force")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+import sys
+import gc
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+
+# The draw pass renders into an off-screen surface
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import skill_tree as st
+
+
+# Same constants main() starts with
+REPULSION_STRENGTH = 10000
+REPULSION_RANGE_SQ = 100**2
+ATTRACTION_STRENGTH = 0.05
+IDEAL_DISTANCE = 100
+DT = 1 / 60
+
+
+# --- Generators: each returns the edge list over skill indices 0..n-1 ---
+
+def gen_chain(n, rng):
+    return [(i - 1, i) for i in range(1, n)]
+
+def gen_tree(n, rng):
+    # Balanced binary tree in heap order
+    return [((i - 1) // 2, i) for i in range(1, n)]
+
+def gen_grid(n, rng):
+    side = max(1, int(math.sqrt(n)))
+    edges = []
+    for i in range(n):
+        if i % side:
+            edges.append((i - 1, i))
+        if i >= side:
+            edges.append((i - side, i))
+    return edges
+
+def gen_scale_free(n, rng, m=2):
+    # Barabási–Albert: each new skill links to m existing ones picked by degree
+    edges = [(0, 1)]
+    ends = [0, 1]
+    for i in range(2, n):
+        targets = set()
+        while len(targets) < min(m, i):
+            targets.add(rng.choice(ends))
+        for t in targets:
+            edges.append((t, i))
+            ends += (t, i)
+    return edges
+
+def gen_small_paths(n, rng, size=5):
+    return [(i - 1, i) for i in range(1, n) if i % size]
+
+GENERATORS = {
+    "chain": gen_chain,
+    "tree": gen_tree,
+    "grid": gen_grid,
+    "scale_free": gen_scale_free,
+    "small_paths": gen_small_paths,
+}
+
+
+def build(kind, n, seed):
+    # Skills at constant density (about one per 60x60 px); paths follow the
+    # connected components, as main() keeps them
+    rng = random.Random(seed)
+    st.Skill.next_id = 0
+    st.Path.next_id = 0
+    spread = math.sqrt(n) * 60
+    skills = [st.Skill(rng.uniform(0, spread), rng.uniform(0, spread), f"S{i}", st.MIN_RADIUS) for i in range(n)]
+    connections = st.SkillGraph()
+    paths = []
+    for s in skills:
+        p = st.Path(st.PATH_COLORS[len(paths) % len(st.PATH_COLORS)])
+        p.add_skill(s)
+        paths.append(p)
+    for a, b in GENERATORS[kind](n, rng):
+        st.link_skills(skills[a], skills[b], connections, paths)
+    return skills, paths, connections
+
+
+# --- Timed operations: setup (untimed) returns the callable to time ---
+
+def op_physics_python(tree):
+    skills, paths, connections = tree
+    grid = st.SpatialHash(math.sqrt(REPULSION_RANGE_SQ))
+    def run():
+        grid.rebuild(skills)
+        st.apply_repulsion_grid(grid, REPULSION_STRENGTH, REPULSION_RANGE_SQ)
+        st.apply_attraction(connections, ATTRACTION_STRENGTH, IDEAL_DISTANCE)
+        for s in skills:
+            s.update(DT)
+    return run
+
+def op_physics_numpy(tree):
+    skills, paths, connections = tree
+    state = st.PhysicsState()
+    state.sync(skills, connections)
+    def run():
+        state.sync(skills, connections)
+        state.step(DT, REPULSION_STRENGTH, REPULSION_RANGE_SQ, ATTRACTION_STRENGTH, IDEAL_DISTANCE)
+    return run
+
+def _op_draw(zoom_for):
+    def op(tree):
+        skills, paths, connections = tree
+        surface = st.pygame.Surface((st.WIDTH, st.HEIGHT))
+        index = st.SceneIndex()
+        xs = [s.x for s in skills]
+        ys = [s.y for s in skills]
+        camera = [(min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2]
+        zoom = zoom_for(max(xs) - min(xs), max(ys) - min(ys))
+        def run():
+            index.rebuild(skills, connections)
+            nodes, edges = st.visible_scene(index, zoom, camera)
+            surface.fill(st.DARK_GRAY)
+            st.draw_scene(surface, nodes, edges, zoom, camera, 0.0, None, None, None)
+        return run
+    return op
+
+# Zoom 1 at the centre (culling does the work) and zoomed out to the whole tree
+op_draw_view = _op_draw(lambda w, h: 1.0)
+op_draw_all = _op_draw(lambda w, h: min(st.WIDTH / max(w, 1), st.HEIGHT / max(h, 1)))
+
+def op_pan_tiled(tree):
+    # Ten 20 px pan frames over a settled tree, drawn from a warm tile cache;
+    # each frame renders at most its budget of newly exposed tiles. The
+    # random scatter is laid out first, as panning happens once settled.
+    skills, paths, connections = tree
+    st.tree_layout(paths, connections)
+    surface = st.pygame.Surface((st.WIDTH, st.HEIGHT))
+    index = st.SceneIndex()
+    index.rebuild(skills, connections)
+    tiles = st.TileCache()
+    tiles.track(skills, connections, False)
+    camera = [sum(s.x for s in skills) / len(skills), sum(s.y for s in skills) / len(skills)]
+    tiles.draw(surface, 0, camera, index)
+    while tiles.pending:
+        tiles.draw(surface, 0, camera, index)
+    def run():
+        for _ in range(10):
+            camera[0] += 20
+            tiles.draw(surface, 0, camera, index)
+    return run
+
+def _hub(tree):
+    skills, paths, connections = tree
+    return max(skills, key=connections.degree)
+
+def op_recalc_after_hub_delete(tree):
+    skills, paths, connections = tree
+    hub = _hub(tree)
+    path = hub.path
+    connections.remove_skill(hub)
+    skills.remove(hub)
+    path.remove_skill(hub)
+    return lambda: st.recalculate_paths_for_path(path, connections, paths)
+
+def op_delete_hub(tree):
+    skills, paths, connections = tree
+    hub = _hub(tree)
+    return lambda: st.delete_skill(hub, skills, connections, paths)
+
+def op_merge_path(tree):
+    # Two paths holding half the skills each
+    skills, paths, connections = tree
+    half = len(skills) // 2
+    a, b = st.Path(), st.Path()
+    for s in skills[:half]:
+        a.add_skill(s)
+    for s in skills[half:]:
+        b.add_skill(s)
+    return lambda: a.merge_path(b)
+
+def _op_round_trip(suffix, save, load):
+    def make(direction):
+        def op(tree):
+            skills, paths, connections = tree
+            fd, filename = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+            _cleanup.append(filename)
+            if direction == "export":
+                return lambda: save(filename, skills, paths, connections)
+            save(filename, skills, paths, connections)
+            return lambda: load(filename, progress=None)
+        return op
+    return make("export"), make("import")
+
+_cleanup = []
+op_csv_export, op_csv_import = _op_round_trip(".csv", st.export_to_csv, st.import_from_csv)
+op_stb_export, op_stb_import = _op_round_trip(".stb", st.export_to_stb, st.import_from_stb)
+
+OPS = {
+    "physics_python": op_physics_python,
+    "physics_numpy": op_physics_numpy,
+    "draw_view": op_draw_view,
+    "draw_all": op_draw_all,
+    "pan_tiled": op_pan_tiled,
+    "recalc_after_hub_delete": op_recalc_after_hub_delete,
+    "delete_hub": op_delete_hub,
+    "merge_path": op_merge_path,
+    "csv_export": op_csv_export,
+    "csv_import": op_csv_import,
+    "stb_export": op_stb_export,
+    "stb_import": op_stb_import,
+}
+
+
+def time_op(kind, n, op, seed, repeat):
+    # Best of repeat, each on a freshly built tree so mutating ops start equal
+    best = math.inf
+    for _ in range(repeat):
+        run = OPS[op](build(kind, n, seed))
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - t0)
+    while _cleanup:
+        os.remove(_cleanup.pop())
+    return best
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file, threshold):
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = {(r["generator"], r["n"], r["op"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["generator"], r["n"], r["op"]))
+        if not old:
+            continue
+        ratio = r["seconds"] / old
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{r['generator']:12s} n={r['n']:7d}  {r['op']:24s} {old*1000:10.2f} -> {r['seconds']*1000:10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time core operations on synthetic skill trees of growing size.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--generators", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    ap.add_argument("--ops", nargs="+", choices=list(OPS), default=list(OPS))
+    ap.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is kept")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_scaling.json", help="JSON results file")
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = ap.parse_args()
+
+    ops = [op for op in args.ops if op != "physics_numpy" or st.np is not None]
+    results = []
+    for n in args.sizes:
+        for kind in args.generators:
+            for op in ops:
+                seconds = time_op(kind, n, op, args.seed, args.repeat)
+                results.append({"generator": kind, "n": n, "op": op, "seconds": seconds})
+                print(f"{kind:12s} n={n:7d}  {op:24s} {seconds*1000:10.2f} ms")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": st.np.__version__ if st.np is not None else None,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "results": results,
+        }, f, indent=1)
+    print(f"[OK] Results written to {args.out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        print(f"[FAIL] slower than {args.compare} by more than x{args.threshold:.2f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,49 @@
-import pygame
 import sys
 import math
 import random
 import csv
-
-import tkinter as tk
-from tkinter import filedialog
-
-
-# Initialize Pygame
-pygame.init()
-
-# Screen dimensions
+import os
+import mmap
+import struct
+import json
+import gzip
+import io
+import time
+import subprocess
+import queue
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+import importlib
+import importlib.util
+
+
+class _LazyModule:
+    # Stands in for a module until something touches it, so the model (Path,
+    # Skill, SkillGraph, file I/O, physics) imports without SDL, tkinter or
+    # numpy. The first attribute access imports the module, runs setup on it
+    # and swaps the real module into this module's globals under alias.
+    def __init__(self, name, alias, setup=None):
+        self._name = name
+        self._alias = alias
+        self._setup = setup
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        if self._setup:
+            self._setup(module)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+# Only the font module is started here: measuring names must not bring up SDL
+# video, so loading and laying out stay headless. main() starts the rest.
+pygame = _LazyModule("pygame", "pygame", setup=lambda m: m.font.init())
+# Vectorized physics is optional; the pure-Python path still works without numpy
+np = _LazyModule("numpy", "np") if importlib.util.find_spec("numpy") else None
+
+# Screen dimensions (the window itself is only opened by main())
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Skill Tree Builder")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -39,18 +68,177 @@ PATH_COLORS = [
 
 MIN_RADIUS = 30
 
+# Level of detail for the render pass, picked from the zoom level
+LOD_FULL, LOD_CIRCLES, LOD_PIXELS = 0, 1, 2
+LOD_NAMES = ("full", "circles", "pixels")
+LOD_TEXT_MIN_ZOOM = 0.6    # below this labels are unreadable
+LOD_CIRCLE_MIN_ZOOM = 0.3  # below this nodes are drawn as single pixels
+
+DAMPING = 0.95
+MAX_SPEED = 600.0  # px/s
+
+# Idle detection: a layout whose mean node speed is below SETTLED_SPEED is
+# settled, and with no interaction the main loop sleeps in event.wait
+SETTLED_SPEED = 2.0  # px/s
+IDLE_WAIT_MS = 500
+MAX_FRAME_DT = 0.05  # s; long waits must not turn into one huge physics step
+SETTLED_STEPS = 10   # batch layout stops after this many settled steps in a row
+
+# Island sleeping: a Path whose mean node speed stays under SLEEP_SPEED for
+# SLEEP_FRAMES frames running is frozen, skipping forces and integration,
+# until it is dragged, edited, linked or approached by a moving node
+SLEEP_SPEED = SETTLED_SPEED # px/s, the bar the main loop idles at
+SLEEP_FRAMES = 30
+WAKE_SPEED = 5 * SLEEP_SPEED # slower neighbours drifting past do not wake an island
+PHYSICS_DT = 1 / 60  # s; fixed step of the physics worker (forces are tuned per 60 Hz step)
+MAX_SUBSTEPS = 8     # steps per wake-up; a longer stall is dropped, not replayed
+PLACEMENT_SPACING = 100 # px per skill when placing skills saved without coordinates
+MULTILEVEL_MIN_NODES = 64 # coarsening stops once a level is this small
+MULTILEVEL_STEPS = 60     # refinement steps per level; the coarsest level gets four times as many
+
 instructions = [
     "Create skill: Right-click.",
     "Rename skill: Select a skill, press Enter to start editing, press Enter again to finish.",
     "Link skills: Hold Shift and left-click Skill A, then Shift + left-click Skill B.",
     "Delete skill: Select it and press Delete.",
     "Detach skill from path: Select it and press D.",
-    "Zoom: Mouse wheel.",
-    "Pan (move canvas): Middle-click and drag."
+    "Select many: Left-drag a box on empty canvas (Shift adds to it, Esc clears); drag one to move them all, Delete / D act on all.",
+    "Zoom: Mouse wheel (scrolls the path list when over the side panel).",
+    "Pan (move canvas): Middle-click and drag.",
+    "Toggle spatial hash repulsion (debug): G.",
+    "Long-range (Barnes-Hut) repulsion: B; adjust accuracy with [ and ].",
+    "Toggle NumPy physics (debug): N; run it on this thread instead of the physics worker: W.",
+    "Toggle sleeping of settled paths (debug): Z.",
+    "Show render statistics (drawn/culled counts): F3.",
+    "Toggle the tile cache used to pan and zoom settled trees (debug): F5.",
+    "Re-layout the whole tree (multilevel): L.",
+    "Lay out each path as a tree and pin it in place: T; unpin everything: U.",
+    "Frame profiler HUD: F2; write the recorded frames as a Chrome trace: F4."
 ]
 instructions_open = False  # collapsed by default
 
 
+# --- Text layout: shared fonts, memoized measurement and wrapping, rendered line cache ---
+
+class LRUCache:
+    # Least-recently-used mapping bounded by the summed cost of its values
+    # (one per entry unless a cost function is given).
+    def __init__(self, budget, cost=None):
+        self.budget = budget
+        self.cost = cost
+        self.total = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.total -= self.cost(old) if self.cost else 1
+        self._data[key] = value
+        self.total += self.cost(value) if self.cost else 1
+        while self.total > self.budget and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self.total -= self.cost(evicted) if self.cost else 1
+
+    def pop(self, key):
+        value = self._data.pop(key, None)
+        if value is not None:
+            self.total -= self.cost(value) if self.cost else 1
+        return value
+
+    def keys(self):
+        return list(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.total = 0
+
+_fonts = {}
+
+def get_font(size):
+    # One Font object per size, so every cache below can key on it
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+def _surface_bytes(surface):
+    w, h = surface.get_size()
+    return w * h * surface.get_bytesize()
+
+class TextLayout:
+    def __init__(self, max_sizes=50000, max_wraps=10000, surface_budget=16 * 1024 * 1024):
+        self._sizes = LRUCache(max_sizes)
+        self._wraps = LRUCache(max_wraps)
+        self._surfaces = LRUCache(surface_budget, _surface_bytes)
+
+    def measure(self, font, text):
+        key = (font, text)
+        size = self._sizes.get(key)
+        if size is None:
+            size = font.size(text)
+            self._sizes.put(key, size)
+        return size
+
+    def wrap(self, text, font, max_width):
+        # Greedy word wrap used for skill labels: a word goes on the current
+        # line while the line stays narrower than max_width (the first word
+        # of a line always fits). Returns (lines, widths, tail_start), where
+        # tail_start is the index of the word that opens the last line.
+        key = (text, font, max_width)
+        wrapped = self._wraps.get(key)
+        if wrapped is not None:
+            return wrapped
+
+        words = text.split(' ')
+        # Appending to the text only changes the last line: earlier lines
+        # were closed by words that can only have grown wider since.
+        prev = self._wraps.get((text[:-1], font, max_width)) if text else None
+        if prev is not None:
+            lines, widths, start = list(prev[0][:-1]), list(prev[1][:-1]), prev[2]
+        else:
+            lines, widths, start = [], [], 0
+
+        tail_start = start
+        current_line = ""
+        for i in range(start, len(words)):
+            word = words[i]
+            test_line = current_line + word + " "
+            if not current_line or self.measure(font, test_line)[0] < max_width:
+                current_line = test_line
+            else:
+                line = current_line.strip()
+                lines.append(line)
+                widths.append(self.measure(font, line)[0])
+                current_line = word + " "
+                tail_start = i
+        line = current_line.strip()
+        lines.append(line)
+        widths.append(self.measure(font, line)[0])
+
+        wrapped = (tuple(lines), tuple(widths), tail_start)
+        self._wraps.put(key, wrapped)
+        return wrapped
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._surfaces.put(key, surface)
+        return surface
+
+text_layout = TextLayout()
+
+
 
 class Path:
     next_id = 0
@@ -58,60 +246,60 @@ class Path:
         self.id = Path.next_id
         Path.next_id += 1
         self.color = color if color else random.choice(PATH_COLORS)
-        self.skills = []
+        self.skills = {} # Insertion-ordered set: skill -> None
+        self.version = 0 # bumped when membership or a member's name changes
 
     def add_skill(self, skill):
         if skill not in self.skills:
-            self.skills.append(skill)
+            self.skills[skill] = None
             skill.path = self
+            self.version += 1
 
     def remove_skill(self, skill):
         if skill in self.skills:
-            self.skills.remove(skill)
+            del self.skills[skill]
             skill.path = None
+            self.version += 1
 
     def merge_path(self, other_path):
-        for skill in other_path.skills[:]: # Iterate over a copy to allow modification
-            other_path.remove_skill(skill)
-            self.add_skill(skill)
+        for skill in other_path.skills:
+            skill.path = self
+        self.skills.update(other_path.skills)
+        other_path.skills.clear()
+        self.version += 1
+        other_path.version += 1
 
 class Skill:
     next_id = 0
-    def __init__(self, x, y, name=""):
+    def __init__(self, x, y, name="", radius=None):
         self.id = Skill.next_id
         Skill.next_id += 1
+        self._phys = None # PhysicsState holding x/y/vx/vy while attached
+        self._slot = -1
         self.x = x
         self.y = y
         self.vx = 0 # Velocity X
         self.vy = 0 # Velocity Y
         self.name = name
         self.is_dragging = False
+        self.pinned = False # held in place by a fixed layout; physics leaves it alone
         self.is_editing = False
         self.path = None # Skill initially belongs to no path
-        self.font = pygame.font.Font(None, 20)
-        self.original_radius = MIN_RADIUS
+        self.original_radius = MIN_RADIUS if radius is None else radius
         self.radius = self.original_radius
-        self.rect = pygame.Rect(x - self.radius, y - self.radius, self.radius * 2, self.radius * 2)
-        self._update_radius()
-
-    def _update_radius(self):
-        words = self.name.split(' ')
-        lines = []
-        current_line = ""
-        max_text_width = 0
+        if radius is None: # a saved radius skips measuring the name
+            self._update_radius()
 
-        for word in words:
-            test_line = current_line + word + " "
-            text_width, _ = self.font.size(test_line)
-            if text_width < (self.original_radius * 1.8) or not current_line: # 1.8 to leave some padding, or if it's the first word
-                current_line = test_line
-            else:
-                lines.append(current_line.strip())
-                max_text_width = max(max_text_width, self.font.size(current_line.strip())[0])
-                current_line = word + " "
-        lines.append(current_line.strip())
-        max_text_width = max(max_text_width, self.font.size(current_line.strip())[0])
+    @property
+    def font(self):
+        return get_font(20) # shared; opened on first draw or measure
 
+    def _update_radius(self):
+        if not self.name: # nothing to measure, and no need to load fonts for it
+            self.original_radius = MIN_RADIUS
+            return
+        lines, widths, _ = text_layout.wrap(self.name, self.font, self.original_radius * 1.8) # 1.8 to leave some padding
+        max_text_width = max(widths)
         total_text_height = len(lines) * self.font.get_linesize()
 
         required_radius_by_width = (max_text_width / 2) + 10 # Add padding
@@ -120,11 +308,7 @@ class Skill:
         new_radius = max(MIN_RADIUS, int(required_radius_by_width), int(required_radius_by_height))
         self.original_radius = new_radius  # permitir crecer y encoger
 
-
-        if new_radius > self.original_radius:
-            self.original_radius = new_radius
-
-    def draw(self, screen, pulsation_time, zoom, camera_offset, is_selected):
+    def draw(self, screen, pulsation_time, zoom, camera_offset, is_selected, lod=LOD_FULL):
         # Use global pulsation time and path color if available
         current_color = self.path.color if self.path else BLUE # Default BLUE if no path
 
@@ -138,7 +322,10 @@ class Skill:
             pulsating_radius = screen_radius
         
         self.radius = int(pulsating_radius)
-        self.rect = pygame.Rect(screen_x - self.radius, screen_y - self.radius, self.radius * 2, self.radius * 2)
+
+        if lod == LOD_PIXELS and not (is_selected or self.is_editing):
+            screen.set_at((int(screen_x), int(screen_y)), current_color)
+            return
 
         # Draw editing glow if in editing mode
         if self.is_editing:
@@ -146,43 +333,115 @@ class Skill:
             pygame.draw.circle(screen, (255, 255, 0), (int(screen_x), int(screen_y)), int(glow_radius), 3) # Yellow glow, 3 pixels thick
 
         pygame.draw.circle(screen, current_color, (int(screen_x), int(screen_y)), self.radius)
-        
-        words = self.name.split(' ')
-        lines = []
-        current_line = ""
-        for word in words:
-            test_line = current_line + word + " "
-            if self.font.size(test_line)[0] < (self.original_radius * 1.8): # 1.8 to leave some padding
-                current_line = test_line
-            else:
-                lines.append(current_line.strip())
-                current_line = word + " "
-        lines.append(current_line.strip())
+        if lod != LOD_FULL:
+            return
 
+        lines = text_layout.wrap(self.name, self.font, self.original_radius * 1.8)[0]
         total_text_height = len(lines) * self.font.get_linesize()
         start_y = screen_y - total_text_height // 2
 
         for line in lines:
-            text_surface = self.font.render(line, True, WHITE)
+            text_surface = text_layout.render(self.font, line, WHITE)
             text_rect = text_surface.get_rect(center=(screen_x, start_y + self.font.get_linesize() // 2))
             screen.blit(text_surface, text_rect)
             start_y += self.font.get_linesize()
 
+    # Position, velocity and drag state live in the PhysicsState arrays while
+    # the skill is attached to one, and in plain attributes otherwise.
+    @property
+    def x(self):
+        return self._x if self._phys is None else self._phys.x.item(self._slot)
+
+    @x.setter
+    def x(self, value):
+        if self._phys is None:
+            self._x = value
+        else:
+            self._phys.x[self._slot] = value
+
+    @property
+    def y(self):
+        return self._y if self._phys is None else self._phys.y.item(self._slot)
+
+    @y.setter
+    def y(self, value):
+        if self._phys is None:
+            self._y = value
+        else:
+            self._phys.y[self._slot] = value
+
+    @property
+    def vx(self):
+        return self._vx if self._phys is None else self._phys.vx.item(self._slot)
+
+    @vx.setter
+    def vx(self, value):
+        if self._phys is None:
+            self._vx = value
+        else:
+            self._phys.vx[self._slot] = value
+
+    @property
+    def vy(self):
+        return self._vy if self._phys is None else self._phys.vy.item(self._slot)
+
+    @vy.setter
+    def vy(self, value):
+        if self._phys is None:
+            self._vy = value
+        else:
+            self._phys.vy[self._slot] = value
+
+    @property
+    def is_dragging(self):
+        return self._is_dragging if self._phys is None else bool(self._phys.dragging[self._slot])
+
+    @is_dragging.setter
+    def is_dragging(self, value):
+        if self._phys is None:
+            self._is_dragging = value
+        else:
+            self._phys.dragging[self._slot] = value
+
+    @property
+    def pinned(self):
+        return self._pinned if self._phys is None else bool(self._phys.pinned[self._slot])
+
+    @pinned.setter
+    def pinned(self, value):
+        if self._phys is None:
+            self._pinned = value
+        else:
+            self._phys.pinned[self._slot] = value
+
+    def _detach(self):
+        phys, slot = self._phys, self._slot
+        self._phys = None
+        self._slot = -1
+        self._x = phys.x.item(slot)
+        self._y = phys.y.item(slot)
+        self._vx = phys.vx.item(slot)
+        self._vy = phys.vy.item(slot)
+        self._is_dragging = bool(phys.dragging[slot])
+        self._pinned = bool(phys.pinned[slot])
+
     def apply_force(self, fx, fy):
         self.vx += fx
         self.vy += fy
 
     def update(self, dt):
+        if self.pinned:
+            self.vx = self.vy = 0
+            return
         if not self.is_dragging:
             self.x += self.vx * dt
             self.y += self.vy * dt
 
         # Dampening
-        self.vx *= 0.95
-        self.vy *= 0.95
+        self.vx *= DAMPING
+        self.vy *= DAMPING
 
         # Cap de velocidad para evitar jitter
-        MAX_SPEED = 600.0  # px/s
         sp2 = self.vx*self.vx + self.vy*self.vy
         if sp2 > MAX_SPEED*MAX_SPEED:
             scale = MAX_SPEED / (sp2 ** 0.5)
@@ -191,15 +450,18 @@ class Skill:
 
 
 
+    def contains_point(self, world_x, world_y):
+        dx = world_x - self.x
+        dy = world_y - self.y
+        return dx*dx + dy*dy <= self.original_radius * self.original_radius
+
     def handle_event(self, event, zoom, camera_offset):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
-                # Actualiza rect con cámara/zoom
-                sx = (self.x - camera_offset[0]) * zoom + WIDTH / 2
-                sy = (self.y - camera_offset[1]) * zoom + HEIGHT / 2
-                sr = self.original_radius * zoom
-                self.rect = pygame.Rect(sx - sr, sy - sr, sr * 2, sr * 2)
-                if self.rect.collidepoint(event.pos):
+                mouse_x, mouse_y = event.pos
+                world_x = (mouse_x - WIDTH / 2) / zoom + camera_offset[0]
+                world_y = (mouse_y - HEIGHT / 2) / zoom + camera_offset[1]
+                if self.contains_point(world_x, world_y):
                     self.is_dragging = True
                     self.vx = 0
                     self.vy = 0
@@ -220,98 +482,1087 @@ class Skill:
             else:
                 self.name += event.unicode
                 self._update_radius()
+            if self.path:
+                self.path.version += 1
+
+
+class SkillGraph:
+    # Connections between skills, indexed by per-skill adjacency sets.
+    # Edges keep the direction they were created with (from -> to) and
+    # iterating the graph yields (from, to) tuples in insertion order.
+    # Neighbours are kept in insertion order too, so traversals (and the
+    # path splits built on them) replay identically from a journal.
+    def __init__(self):
+        self.adjacency = {}  # skill -> {neighbour: None}, an insertion-ordered set
+        self.edges = {}      # (from, to) -> None, used as an ordered set
+        self.version = 0     # bumped on every change to the edges or the skill set, for caches keyed on them
+
+    def __iter__(self):
+        return iter(self.edges)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def has_edge(self, a, b):
+        return b in self.adjacency.get(a, ())
+
+    def neighbors(self, skill):
+        return self.adjacency.get(skill, ())
+
+    def degree(self, skill):
+        return len(self.adjacency.get(skill, ()))
+
+    def add_edge(self, a, b):
+        if a is b or self.has_edge(a, b):
+            return False
+        self.edges[(a, b)] = None
+        self.adjacency.setdefault(a, {})[b] = None
+        self.adjacency.setdefault(b, {})[a] = None
+        self.version += 1
+        return True
+
+    def remove_edge(self, a, b):
+        if not self.has_edge(a, b):
+            return False
+        if self.edges.pop((a, b), False) is False:
+            del self.edges[(b, a)]
+        for s, other in ((a, b), (b, a)):
+            adj = self.adjacency[s]
+            del adj[other]
+            if not adj:
+                del self.adjacency[s]
+        self.version += 1
+        return True
 
+    def add_skill(self, skill):
+        # The graph keeps no unlinked skills, but caches keyed on its version
+        # also stand for the skill list, and a delete plus a create leaves
+        # that list as long as before
+        self.version += 1
 
-def draw_side_panel(screen, selected_path):
-    if not selected_path:
+    def remove_skill(self, skill):
+        # Drops every edge touching skill in O(degree); returns whether it had any
+        self.version += 1
+        neighbours = self.adjacency.pop(skill, None)
+        if not neighbours:
+            return False
+        for other in neighbours:
+            if self.edges.pop((skill, other), False) is False:
+                del self.edges[(other, skill)]
+            adj = self.adjacency[other]
+            del adj[skill]
+            if not adj:
+                del self.adjacency[other]
+        return True
+
+
+# Neighbouring cells visited from each cell so every pair of cells is seen once
+_FORWARD_CELLS = ((1, 0), (-1, 1), (0, 1), (1, 1))
+
+class SpatialHash:
+    # Uniform grid of skills keyed by cell; with cell_size equal to the
+    # repulsion range, every pair within range shares a cell or is adjacent.
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def rebuild(self, skills):
+        inv = 1.0 / self.cell_size
+        cells = {}
+        for s in skills:
+            key = (math.floor(s.x * inv), math.floor(s.y * inv))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [s]
+            else:
+                cell.append(s)
+        self.cells = cells
+
+    def neighbour_pairs(self):
+        cells = self.cells
+        for (cx, cy), cell in cells.items():
+            n = len(cell)
+            for i in range(n):
+                s1 = cell[i]
+                for j in range(i + 1, n):
+                    yield s1, cell[j]
+            for ox, oy in _FORWARD_CELLS:
+                other = cells.get((cx + ox, cy + oy))
+                if other:
+                    for s1 in cell:
+                        for s2 in other:
+                            yield s1, s2
+
+
+def _repel(s1, s2, repulsion_strength, repulsion_range_sq):
+    dx = s2.x - s1.x
+    dy = s2.y - s1.y
+    distance_sq = dx*dx + dy*dy
+    if distance_sq == 0 or distance_sq > repulsion_range_sq:
         return
 
-    panel_width = 200
-    panel_rect = pygame.Rect(WIDTH - panel_width, 0, panel_width, HEIGHT)
-    pygame.draw.rect(screen, DARK_GRAY, panel_rect)
-    pygame.draw.rect(screen, WHITE, panel_rect, 2)
-
-    font_title = pygame.font.Font(None, 24)
-    title_surface = font_title.render(f"Path {selected_path.id}", True, WHITE)
-    screen.blit(title_surface, (WIDTH - panel_width + 10, 10))
-
-    font_skill = pygame.font.Font(None, 20)
-    y_offset = 40
-    for skill in selected_path.skills:
-        skill_name = skill.name if skill.name else "empty"
-        skill_surface = font_skill.render(skill_name, True, WHITE)
-        screen.blit(skill_surface, (WIDTH - panel_width + 10, y_offset))
-        y_offset += 25
+    distance = math.sqrt(distance_sq)
+    force = repulsion_strength / distance_sq
+    fx = force * dx / distance
+    fy = force * dy / distance
+    s1.apply_force(-fx, -fy)
+    s2.apply_force(fx, fy)
+
+def apply_repulsion_brute(skills, repulsion_strength, repulsion_range_sq):
+    for i, s1 in enumerate(skills):
+        for s2 in skills[i+1:]:
+            _repel(s1, s2, repulsion_strength, repulsion_range_sq)
+
+def apply_repulsion_grid(spatial_hash, repulsion_strength, repulsion_range_sq):
+    # Same forces as apply_repulsion_brute, but only compares neighbouring cells
+    for s1, s2 in spatial_hash.neighbour_pairs():
+        _repel(s1, s2, repulsion_strength, repulsion_range_sq)
+
+class QuadTree:
+    # Flat-array quadtree over point lists; node k covers the square
+    # (x0[k], y0[k], size[k]) and stores its body count and centre of mass.
+    MAX_DEPTH = 24 # coincident points share a leaf instead of splitting forever
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        min_x, max_x = min(xs), max(xs)
+        min_y, max_y = min(ys), max(ys)
+        size = max(max_x - min_x, max_y - min_y, 1.0) * 1.0001
+        self.x0 = [min_x]
+        self.y0 = [min_y]
+        self.size = [size]
+        self.children = [None] # None for leaves, else 4 node ids
+        self.bodies = [[]]
+        self.depth = [0]
+        for i in range(len(xs)):
+            self._insert(i)
+        self._summarize()
+
+    def _new_node(self, x0, y0, size, depth):
+        self.x0.append(x0)
+        self.y0.append(y0)
+        self.size.append(size)
+        self.children.append(None)
+        self.bodies.append([])
+        self.depth.append(depth)
+        return len(self.x0) - 1
+
+    def _child_for(self, k, x, y):
+        half = self.size[k] / 2
+        q = (1 if x >= self.x0[k] + half else 0) + (2 if y >= self.y0[k] + half else 0)
+        return self.children[k][q]
+
+    def _insert(self, i):
+        x, y = self.xs[i], self.ys[i]
+        k = 0
+        while True:
+            if self.children[k] is not None:
+                k = self._child_for(k, x, y)
+                continue
+            bodies = self.bodies[k]
+            if not bodies or self.depth[k] >= self.MAX_DEPTH:
+                bodies.append(i)
+                return
+            # Split the leaf and push its body one level down
+            half = self.size[k] / 2
+            x0, y0, depth = self.x0[k], self.y0[k], self.depth[k] + 1
+            self.children[k] = [
+                self._new_node(x0, y0, half, depth),
+                self._new_node(x0 + half, y0, half, depth),
+                self._new_node(x0, y0 + half, half, depth),
+                self._new_node(x0 + half, y0 + half, half, depth),
+            ]
+            self.bodies[k] = []
+            for j in bodies:
+                self.bodies[self._child_for(k, self.xs[j], self.ys[j])].append(j)
+
+    def _summarize(self):
+        count = len(self.x0)
+        self.mass = [0] * count
+        self.mx = [0.0] * count
+        self.my = [0.0] * count
+        # Children are always created after their parent
+        for k in range(count - 1, -1, -1):
+            children = self.children[k]
+            if children is None:
+                members = self.bodies[k]
+                m = len(members)
+                if m:
+                    self.mx[k] = sum(self.xs[j] for j in members) / m
+                    self.my[k] = sum(self.ys[j] for j in members) / m
+            else:
+                m = sum(self.mass[c] for c in children)
+                if m:
+                    self.mx[k] = sum(self.mx[c] * self.mass[c] for c in children) / m
+                    self.my[k] = sum(self.my[c] * self.mass[c] for c in children) / m
+            self.mass[k] = m
+
+def barnes_hut_forces(xs, ys, repulsion_strength, theta, targets=None):
+    # Repulsion with no cutoff; cells with size/distance < theta act as one body.
+    # Only the first targets points get forces; the rest still act as bodies.
+    n = len(xs)
+    fxs = [0.0] * n
+    fys = [0.0] * n
+    if n < 2:
+        return fxs, fys
+
+    tree = QuadTree(xs, ys)
+    mass, mx, my = tree.mass, tree.mx, tree.my
+    size, children, bodies = tree.size, tree.children, tree.bodies
+    theta_sq = theta * theta
+
+    for i in range(n if targets is None else targets):
+        xi, yi = xs[i], ys[i]
+        fx = fy = 0.0
+        stack = [0]
+        while stack:
+            k = stack.pop()
+            m = mass[k]
+            if not m:
+                continue
+            kids = children[k]
+            if kids is None:
+                for j in bodies[k]:
+                    dx = xs[j] - xi
+                    dy = ys[j] - yi
+                    distance_sq = dx*dx + dy*dy
+                    if distance_sq == 0:
+                        continue
+                    force = repulsion_strength / (distance_sq * math.sqrt(distance_sq))
+                    fx -= force * dx
+                    fy -= force * dy
+                continue
+            dx = mx[k] - xi
+            dy = my[k] - yi
+            distance_sq = dx*dx + dy*dy
+            if distance_sq > 0 and size[k] * size[k] < theta_sq * distance_sq:
+                force = repulsion_strength * m / (distance_sq * math.sqrt(distance_sq))
+                fx -= force * dx
+                fy -= force * dy
+            else:
+                stack.extend(kids)
+        fxs[i] = fx
+        fys[i] = fy
+    return fxs, fys
+
+def apply_repulsion_barnes_hut(skills, repulsion_strength, theta, static=()):
+    # static skills repel the others but are left alone themselves
+    xs = [s.x for s in skills] + [s.x for s in static]
+    ys = [s.y for s in skills] + [s.y for s in static]
+    fxs, fys = barnes_hut_forces(xs, ys, repulsion_strength, theta, len(skills))
+    for s, fx, fy in zip(skills, fxs, fys):
+        s.apply_force(fx, fy)
+
+def apply_attraction(connections, attraction_strength, ideal_distance):
+    for s1, s2 in connections:
+        dx = s2.x - s1.x
+        dy = s2.y - s1.y
+        distance = math.sqrt(dx*dx + dy*dy)
+        if distance == 0: continue
+
+        displacement = distance - ideal_distance
+        force = attraction_strength * displacement
+        fx = force * dx / distance
+        fy = force * dy / distance
+        s1.apply_force(fx, fy)
+        s2.apply_force(-fx, -fy)
+
+
+def kinetic_energy(skills):
+    return 0.5 * sum(s.vx*s.vx + s.vy*s.vy for s in skills)
+
+def is_settled(energy, node_count):
+    return energy <= 0.5 * node_count * SETTLED_SPEED * SETTLED_SPEED
+
+class IslandSleep:
+    # Island sleeping for the per-Skill physics; PhysicsState.settle does the
+    # same over its arrays. A Path falls asleep at its current version, so a
+    # link, split or rename since then (they all bump Path.version) wakes it.
+    def __init__(self):
+        self.asleep = {} # path -> Path.version it fell asleep at
+        self.calm = {}   # path -> settled frames in a row
+        self.grid = None # SpatialHash of the sleeping skills
+        self._changed = True
+
+    def clear(self):
+        self.asleep.clear()
+        self.calm.clear()
+        self._changed = True
+
+    def split(self, skills, wake_range_sq):
+        # (awake, sleeping) skills; a sleeping island with a dragged skill wakes
+        state = {}
+        awake, sleeping = [], []
+        for s in skills:
+            p = s.path
+            asleep = state.get(p)
+            if asleep is None:
+                version = self.asleep.get(p)
+                asleep = state[p] = version is not None and version == p.version
+                if version is not None and not asleep:
+                    del self.asleep[p]
+                    self._changed = True
+            (sleeping if asleep else awake).append(s)
+        held = {s.path for s in sleeping if s.is_dragging}
+        if held:
+            for p in held:
+                del self.asleep[p]
+            self._changed = True
+            awake += [s for s in sleeping if s.path in held]
+            sleeping = [s for s in sleeping if s.path not in held]
+        if self._changed:
+            if self.grid is None or self.grid.cell_size != math.sqrt(wake_range_sq):
+                self.grid = SpatialHash(math.sqrt(wake_range_sq))
+            self.grid.rebuild(sleeping)
+            self._changed = False
+        return awake, sleeping
+
+    def near(self, skills, range_sq):
+        # Sleeping skills within range of any of skills
+        cells = self.grid.cells
+        inv = 1.0 / self.grid.cell_size
+        found = {}
+        for s in skills:
+            cx, cy = math.floor(s.x * inv), math.floor(s.y * inv)
+            for ox in (-1, 0, 1):
+                for oy in (-1, 0, 1):
+                    for t in cells.get((cx + ox, cy + oy), ()):
+                        dx = t.x - s.x
+                        dy = t.y - s.y
+                        if dx*dx + dy*dy <= range_sq:
+                            found[t] = None
+        return list(found)
+
+    def settle(self, awake, wake_range_sq):
+        # After the update: islands calm for SLEEP_FRAMES frames fall asleep,
+        # sleeping ones with an awake skill faster than WAKE_SPEED within
+        # range wake up
+        limit = SLEEP_SPEED * SLEEP_SPEED
+        energy = {}
+        count = {}
+        held = set()
+        for s in awake:
+            p = s.path
+            energy[p] = energy.get(p, 0.0) + s.vx*s.vx + s.vy*s.vy
+            count[p] = count.get(p, 0) + 1
+            if s.is_dragging:
+                held.add(p)
+        for p, e in energy.items():
+            if p is None or p in held or e > count[p] * limit:
+                self.calm.pop(p, None)
+                continue
+            calm = self.calm.get(p, 0) + 1
+            if calm < SLEEP_FRAMES:
+                self.calm[p] = calm
+                continue
+            del self.calm[p]
+            self.asleep[p] = p.version
+            for s in p.skills:
+                s.vx = s.vy = 0
+            self._changed = True
+        if self.asleep and self.grid is not None:
+            wake = WAKE_SPEED * WAKE_SPEED
+            movers = [s for s in awake if s.is_dragging or s.vx*s.vx + s.vy*s.vy > wake]
+            for t in self.near(movers, wake_range_sq):
+                if self.asleep.pop(t.path, None) is not None:
+                    self._changed = True
+
+def awake_edges(connections, awake):
+    # The edges among awake skills; an edge never joins two islands
+    edges = connections.edges
+    return [(a, b) for a in awake for b in connections.neighbors(a) if (a, b) in edges]
+
+def _np_repulsion(x, y, repulsion_strength, repulsion_range_sq):
+    # Cell-list repulsion over sorted cell keys: for each of the 5 forward
+    # neighbour offsets, every node gets the [lo, hi) slice of nodes in that
+    # cell and the slices are expanded into flat (i, j) pair arrays.
+    n = len(x)
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+    if n < 2:
+        return fx, fy
+
+    cell = math.sqrt(repulsion_range_sq)
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    cx -= cx.min()
+    cy -= cy.min() - 1          # keep cy - 1 >= 0 ...
+    width = int(cy.max()) + 2   # ... and cy + 1 < width, so keys never wrap rows
+    keys = cx * width + cy
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    positions = np.arange(n)
+
+    for ox, oy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        target = sorted_keys + (ox * width + oy)
+        lo = np.searchsorted(sorted_keys, target, side="left")
+        hi = np.searchsorted(sorted_keys, target, side="right")
+        if ox == 0 and oy == 0:
+            lo = np.maximum(lo, positions + 1) # each same-cell pair once
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        starts = np.cumsum(counts) - counts
+        ii = np.repeat(positions, counts)
+        jj = np.repeat(lo - starts, counts) + np.arange(total)
+        i = order[ii]
+        j = order[jj]
+
+        dx = x[j] - x[i]
+        dy = y[j] - y[i]
+        distance_sq = dx*dx + dy*dy
+        near = (distance_sq > 0) & (distance_sq <= repulsion_range_sq)
+        i, j, dx, dy, distance_sq = i[near], j[near], dx[near], dy[near], distance_sq[near]
+        force = repulsion_strength / (distance_sq * np.sqrt(distance_sq))
+        pfx = force * dx
+        pfy = force * dy
+        fx += np.bincount(j, pfx, n) - np.bincount(i, pfx, n)
+        fy += np.bincount(j, pfy, n) - np.bincount(i, pfy, n)
+    return fx, fy
+
+def _cell_keys(x, y, cell):
+    # One int64 per grid cell (x cell in the high half, y cell in the low)
+    return (np.floor(x / cell).astype(np.int64) << 32) + np.floor(y / cell).astype(np.int64)
+
+_NEIGHBOUR_KEYS = [(ox << 32) + oy for ox in (-1, 0, 1) for oy in (-1, 0, 1)] # key offsets of the 3x3 block
+
+class PhysicsState:
+    # Struct-of-arrays physics: positions and velocities of every skill in
+    # contiguous arrays indexed by slot, edges as two slot arrays. Attached
+    # Skill objects read and write through to these arrays.
+    def __init__(self):
+        self.skills = []
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.vx = np.zeros(0)
+        self.vy = np.zeros(0)
+        self.dragging = np.zeros(0, dtype=bool)
+        self.pinned = np.zeros(0, dtype=bool)
+        self.edge_a = np.zeros(0, dtype=np.intp)
+        self.edge_b = np.zeros(0, dtype=np.intp)
+        self._edges_source = None
+        self._edges_version = -1
+        # Island sleeping. frozen (per slot) is all step() looks at, and is
+        # replaced rather than written to, so caches key on its identity.
+        # The per-island arrays live only on the UI side, for settle().
+        self.frozen = np.zeros(0, dtype=bool)
+        self.island = np.zeros(0, dtype=np.intp) # slot -> island (Path) index
+        self.island_paths = []
+        self.island_versions = [] # Path.version when the islands were built
+        self.island_size = np.zeros(0, dtype=np.intp)
+        self.asleep = np.zeros(0, dtype=bool)
+        self.calm = np.zeros(0, dtype=np.intp) # settled frames in a row
+        self._active = (None, None, None) # (frozen, edge_a) it was built from, awake slots, their edges
+        self._frozen_cells = (None, None, None) # (frozen, cell size) it was built from, sorted keys, slots
+
+    def sync(self, skills, connections):
+        # Returns (skills re-slotted, edges rebuilt)
+        reslotted = self.skills != skills
+        if reslotted:
+            self._attach(skills)
+            self._edges_source = None
+        edges_changed = connections is not self._edges_source or connections.version != self._edges_version
+        if edges_changed:
+            m = len(connections)
+            self.edge_a = np.fromiter((a._slot for a, _ in connections), np.intp, m)
+            self.edge_b = np.fromiter((b._slot for _, b in connections), np.intp, m)
+            self._edges_source = connections
+            self._edges_version = connections.version
+            # Skills and paths only change together with the slots or the edges
+            self._build_islands()
+        return reslotted, edges_changed
+
+    def _build_islands(self):
+        # Each Path is an island. One whose version is unchanged since the
+        # last build (not linked, split or renamed) keeps its sleep state;
+        # any other starts awake.
+        memory = {p: (v, a, c) for p, v, a, c in zip(self.island_paths, self.island_versions,
+                                                      self.asleep.tolist(), self.calm.tolist())}
+        index = {}
+        n = len(self.skills)
+        self.island = np.fromiter((index.setdefault(s.path, len(index)) for s in self.skills), np.intp, n)
+        self.island_paths = list(index)
+        self.island_versions = [p.version if p else 0 for p in self.island_paths]
+        k = len(index)
+        self.asleep = np.zeros(k, dtype=bool)
+        self.calm = np.zeros(k, dtype=np.intp)
+        for i, (p, version) in enumerate(zip(self.island_paths, self.island_versions)):
+            kept = memory.get(p)
+            if kept and kept[0] == version:
+                self.asleep[i], self.calm[i] = kept[1], kept[2]
+        self.island_size = np.bincount(self.island, minlength=k)
+        self.frozen = self.asleep[self.island]
+
+    def _attach(self, skills):
+        keep = set(skills)
+        for s in self.skills:
+            if s not in keep:
+                s._detach()
+        n = len(skills)
+        # Gather before re-slotting: attached skills still read the old arrays
+        x = np.fromiter((s.x for s in skills), float, n)
+        y = np.fromiter((s.y for s in skills), float, n)
+        vx = np.fromiter((s.vx for s in skills), float, n)
+        vy = np.fromiter((s.vy for s in skills), float, n)
+        dragging = np.fromiter((s.is_dragging for s in skills), bool, n)
+        pinned = np.fromiter((s.pinned for s in skills), bool, n)
+        self.x, self.y, self.vx, self.vy, self.dragging, self.pinned = x, y, vx, vy, dragging, pinned
+        for slot, s in enumerate(skills):
+            s._phys = self
+            s._slot = slot
+        self.skills = list(skills)
+
+    def release(self):
+        for s in self.skills:
+            s._detach()
+        self.skills = []
+        self.island_paths = [] # positions changed behind its back: everything wakes
+        self.asleep = np.zeros(0, dtype=bool)
+
+    def kinetic_energy(self):
+        return 0.5 * float(self.vx @ self.vx + self.vy @ self.vy)
+
+    def _awake(self):
+        # Awake slots and the edges between them, renumbered into that list;
+        # an edge never joins two islands, so it is wholly awake or asleep
+        key, active, edges = self._active
+        if key is None or key[0] is not self.frozen or key[1] is not self.edge_a:
+            active = np.flatnonzero(~self.frozen)
+            position = np.full(len(self.frozen), -1, dtype=np.intp)
+            position[active] = np.arange(len(active))
+            a, b = position[self.edge_a], position[self.edge_b]
+            keep = (a >= 0) & (b >= 0)
+            edges = (a[keep], b[keep])
+            self._active = ((self.frozen, self.edge_a), active, edges)
+        return active, edges
+
+    def _frozen_cells_index(self, cell):
+        # Frozen slots sorted by cell key; they do not move while frozen
+        key, keys, slots = self._frozen_cells
+        if key is None or key[0] is not self.frozen or key[1] != cell:
+            slots = np.flatnonzero(self.frozen)
+            keys = _cell_keys(self.x[slots], self.y[slots], cell)
+            order = np.argsort(keys, kind="stable")
+            keys, slots = keys[order], slots[order]
+            self._frozen_cells = ((self.frozen, cell), keys, slots)
+        return keys, slots
+
+    def frozen_near(self, px, py, cell):
+        # Frozen slots in or next to a query point's cell: every frozen skill
+        # within cell distance of one, and a few more. Both sides are sorted
+        # key lists, so this is merges rather than random lookups.
+        keys, slots = self._frozen_cells_index(cell)
+        if not len(px):
+            return slots[:0]
+        around = np.unique(_cell_keys(px, py, cell))
+        around = np.unique((around[:, None] + _NEIGHBOUR_KEYS).ravel())
+        at = np.minimum(np.searchsorted(around, keys), len(around) - 1)
+        return slots[around[at] == keys]
+
+    def _set_asleep(self, asleep):
+        self.asleep = asleep
+        self.frozen = asleep[self.island]
+        self.vx[self.frozen] = 0
+        self.vy[self.frozen] = 0
+
+    def settle(self, wake_range_sq):
+        # UI side, once a frame after physics: islands calm for SLEEP_FRAMES
+        # frames fall asleep; sleeping ones holding a dragged skill, or with
+        # an awake skill faster than WAKE_SPEED in a neighbouring cell of the
+        # wake range, wake up
+        k = len(self.island_paths)
+        if not k or len(self.island) != len(self.x):
+            return
+        active, _ = self._awake()
+        island = self.island
+        speed_sq = self.vx[active]**2 + self.vy[active]**2
+        energy = np.bincount(island[active], speed_sq, k)
+        held = island[np.flatnonzero(self.dragging)]
+        calm = (energy <= self.island_size * SLEEP_SPEED * SLEEP_SPEED) & ~self.asleep
+        calm[held] = False
+        self.calm = np.where(calm, self.calm + 1, 0)
+        falling = self.calm >= SLEEP_FRAMES
+        waking = np.zeros(k, dtype=bool)
+        waking[held] = self.asleep[held]
+        if self.asleep.any():
+            movers = active[(speed_sq > WAKE_SPEED * WAKE_SPEED) | self.dragging[active]]
+            if len(movers):
+                waking[island[self.frozen_near(self.x[movers], self.y[movers], math.sqrt(wake_range_sq))]] = True
+        if falling.any() or waking.any():
+            asleep = self.asleep.copy()
+            asleep[falling] = True
+            asleep[waking] = False
+            self.calm[falling | waking] = 0
+            self._set_asleep(asleep)
+
+    def wake(self, skill):
+        # An edit that moves nothing (a rename) still wakes the island
+        if skill._phys is self and len(self.island) == len(self.x):
+            i = self.island[skill._slot]
+            if self.asleep[i]:
+                asleep = self.asleep.copy()
+                asleep[i] = False
+                self._set_asleep(asleep)
+
+    def wake_all(self):
+        if self.asleep.any():
+            self.calm[:] = 0
+            self._set_asleep(np.zeros(len(self.asleep), dtype=bool))
+
+    def step(self, dt, repulsion_strength, repulsion_range_sq, attraction_strength, ideal_distance,
+             barnes_hut_theta=None):
+        x, y = self.x, self.y
+        frozen_count = np.count_nonzero(self.frozen)
+        if frozen_count == len(x) > 0:
+            return # everything asleep
+        if frozen_count * 2 >= len(x):
+            # Mostly asleep: only awake skills get forces and move; frozen
+            # ones within range (all of them, for Barnes-Hut) still push on
+            # them. Below half, gathering the subsets costs more than it saves.
+            active, (a, b) = self._awake()
+            px, py = x[active], y[active]
+            vx, vy = self.vx[active], self.vy[active]
+            dragging, pinned = self.dragging[active], self.pinned[active]
+            if barnes_hut_theta is None:
+                halo = self.frozen_near(px, py, math.sqrt(repulsion_range_sq))
+            else:
+                halo = np.flatnonzero(self.frozen)
+            sx, sy = np.concatenate((px, x[halo])), np.concatenate((py, y[halo]))
+        else:
+            active = None
+            a, b = self.edge_a, self.edge_b
+            px, py, sx, sy = x, y, x, y
+            vx, vy = self.vx, self.vy
+            dragging, pinned = self.dragging, self.pinned
+            if frozen_count:
+                pinned = pinned | self.frozen # held like pins: same forces on the rest, no motion
+        n = len(px)
+        if barnes_hut_theta is None:
+            fx, fy = _np_repulsion(sx, sy, repulsion_strength, repulsion_range_sq)
+        else:
+            bfx, bfy = barnes_hut_forces(sx.tolist(), sy.tolist(), repulsion_strength, barnes_hut_theta, n)
+            fx = np.array(bfx, dtype=float)
+            fy = np.array(bfy, dtype=float)
+        fx, fy = fx[:n], fy[:n]
+
+        # Spring attraction along edges
+        if len(a):
+            dx = px[b] - px[a]
+            dy = py[b] - py[a]
+            distance = np.hypot(dx, dy)
+            linked = distance > 0
+            a, b, dx, dy, distance = a[linked], b[linked], dx[linked], dy[linked], distance[linked]
+            force = attraction_strength * (distance - ideal_distance) / distance
+            efx = force * dx
+            efy = force * dy
+            fx += np.bincount(a, efx, n) - np.bincount(b, efx, n)
+            fy += np.bincount(a, efy, n) - np.bincount(b, efy, n)
+
+        # Same integration as Skill.update
+        vx += fx
+        vy += fy
+        free = ~(dragging | pinned)
+        px[free] += vx[free] * dt
+        py[free] += vy[free] * dt
+        vx *= DAMPING
+        vy *= DAMPING
+        vx[pinned] = 0
+        vy[pinned] = 0
+        sp2 = vx*vx + vy*vy
+        fast = sp2 > MAX_SPEED*MAX_SPEED
+        if fast.any():
+            scale = MAX_SPEED / np.sqrt(sp2[fast])
+            vx[fast] *= scale
+            vy[fast] *= scale
+        if active is not None:
+            x[active], y[active] = px, py
+            self.vx[active], self.vy[active] = vx, vy
+
+
+class PhysicsWorker:
+    # Steps a private PhysicsState on a background thread at a fixed
+    # PHYSICS_DT, whatever the frame rate. The UI thread only talks to it
+    # through a command queue (load, edges, params, pins, frozen). Layout
+    # pins (Skill.pinned) only travel with 'load', so changing them means a
+    # view.release() first. Island sleeping is decided on the UI side
+    # (view.settle) and only the frozen mask is sent. Each result is
+    # published as a fresh (generation, x, y, vx, vy) tuple and the front
+    # reference swapped, so the render loop picks it up without locks.
+    def __init__(self):
+        self.front = None
+        self.generation = 0
+        self.busy = False # simulating, or holding commands it has not run yet
+        self._commands = queue.SimpleQueue()
+        self._adopted = None
+        self._loaded = False
+        self._params = None
+        self._pins = np.zeros(0, dtype=np.intp)
+        self._pin_x = self._pin_y = np.zeros(0)
+        self._frozen = None # the view's frozen mask last sent
+        self._thread = threading.Thread(target=self._run, name="physics", daemon=True)
+        self._thread.start()
+
+    # --- UI thread ---
+    def update(self, view, skills, connections, params):
+        # view is the UI-side PhysicsState the Skill objects are attached to.
+        # Sends whatever changed since the last frame, then adopts the newest
+        # snapshot into view. Returns whether positions changed.
+        reslotted, edges_changed = view.sync(skills, connections)
+        loading = reslotted or not self._loaded
+        if loading:
+            self.generation += 1
+            self._send('load', self.generation, view.x.copy(), view.y.copy(), view.vx.copy(),
+                       view.vy.copy(), view.dragging.copy(), view.pinned.copy(), view.frozen, view.edge_a, view.edge_b)
+            self._loaded = True
+        elif edges_changed:
+            self._send('edges', view.edge_a, view.edge_b)
+        if view.frozen is not self._frozen:
+            if not loading:
+                self._send('frozen', view.frozen)
+            self._frozen = view.frozen
+        if params != self._params:
+            self._send('params', params)
+            self._params = params
+
+        # Dragged skills are pinned where the UI put them
+        pins = np.flatnonzero(view.dragging)
+        if len(pins) or len(self._pins):
+            self._pins, self._pin_x, self._pin_y = pins, view.x[pins], view.y[pins]
+            self._send('pins', pins, self._pin_x, self._pin_y)
+
+        snap = self.front
+        if snap is None or snap is self._adopted or snap[0] != self.generation:
+            return False
+        self._adopted = snap
+        _, view.x, view.y, view.vx, view.vy = snap
+        view.x[self._pins] = self._pin_x # the snapshot may predate the last drag
+        view.y[self._pins] = self._pin_y
+        return True
+
+    def _send(self, *command):
+        self.busy = True # until the worker has run it and settled again
+        self._commands.put(command)
+
+    def stop(self):
+        self._commands.put(('stop',))
+        self._thread.join(timeout=1.0)
+
+    # --- Worker thread ---
+    def _run(self):
+        state = PhysicsState()
+        generation = 0
+        params = None
+        running = False # something to simulate and not settled yet
+        pending = 0.0   # simulated time owed, in seconds
+        last = time.perf_counter()
+        while True:
+            try:
+                command = self._commands.get(block=not running)
+            except queue.Empty:
+                command = None
+            while command:
+                kind = command[0]
+                if kind == 'stop':
+                    return
+                elif kind == 'load':
+                    (generation, state.x, state.y, state.vx, state.vy, state.dragging, state.pinned,
+                     state.frozen, state.edge_a, state.edge_b) = command[1:]
+                elif kind == 'edges':
+                    state.edge_a, state.edge_b = command[1:]
+                elif kind == 'frozen':
+                    state.frozen = command[1]
+                    state.vx[state.frozen] = 0
+                    state.vy[state.frozen] = 0
+                elif kind == 'params':
+                    params = command[1]
+                elif kind == 'pins':
+                    pins, px, py = command[1:]
+                    state.dragging[:] = False
+                    state.dragging[pins] = True
+                    state.x[pins] = px
+                    state.y[pins] = py
+                if not running:
+                    running = self.busy = True
+                    last = time.perf_counter()
+                try:
+                    command = self._commands.get_nowait()
+                except queue.Empty:
+                    command = None
+            if params is None or not len(state.x):
+                running = self.busy = False
+                continue
+
+            now = time.perf_counter()
+            pending = min(pending + now - last, MAX_SUBSTEPS * PHYSICS_DT)
+            last = now
+            steps = 0
+            while pending >= PHYSICS_DT:
+                state.step(PHYSICS_DT, *params)
+                pending -= PHYSICS_DT
+                steps += 1
+            if steps:
+                self.front = (generation, state.x.copy(), state.y.copy(), state.vx.copy(), state.vy.copy())
+                if is_settled(state.kinetic_energy(), len(state.x)) and not state.dragging.any():
+                    running = self.busy = False # sleep on the queue until the UI sends something
+                    pending = 0.0
+                    continue
+            time.sleep(max(0.0, PHYSICS_DT - pending))
+
+
+class SidePanel:
+    # Retained, virtualized list of the selected path's skills. The panel is
+    # rendered into a cached surface that is rebuilt only when the path, its
+    # membership/names (Path.version) or the scroll position change, and only
+    # the rows inside the panel are rendered.
+    PANEL_WIDTH = 200
+    LIST_TOP = 40
+    ROW_HEIGHT = 25
+
+    def __init__(self):
+        self.scroll = 0
+        self._path = None
+        self._rows = []
+        self._rows_version = -1
+        self._key = None
+        self._surface = None
+
+    def contains(self, pos):
+        return pos[0] >= WIDTH - self.PANEL_WIDTH
+
+    def _sync(self, path):
+        if path is not self._path:
+            self._path = path
+            self._rows_version = -1
+            self.scroll = 0
+        if path.version != self._rows_version:
+            self._rows = list(path.skills)
+            self._rows_version = path.version
+        self.scroll = max(0, min(self.scroll, self._max_scroll()))
+
+    def _max_scroll(self):
+        return max(0, len(self._rows) * self.ROW_HEIGHT - (HEIGHT - self.LIST_TOP))
+
+    def scroll_by(self, path, rows):
+        self._sync(path)
+        self.scroll = max(0, min(self.scroll + rows * self.ROW_HEIGHT, self._max_scroll()))
+
+    def draw(self, screen, selected_path):
+        if not selected_path:
+            return
+        self._sync(selected_path)
+        key = (selected_path.id, selected_path.version, self.scroll)
+        if key != self._key:
+            self._surface = self._build(selected_path)
+            self._key = key
+        screen.blit(self._surface, (WIDTH - self.PANEL_WIDTH, 0))
+
+    def _build(self, path):
+        surface = pygame.Surface((self.PANEL_WIDTH, HEIGHT))
+        surface.fill(DARK_GRAY)
+
+        font_skill = get_font(20)
+        list_height = HEIGHT - self.LIST_TOP
+        surface.set_clip(pygame.Rect(0, self.LIST_TOP, self.PANEL_WIDTH, list_height))
+        first = self.scroll // self.ROW_HEIGHT
+        last = min(len(self._rows), (self.scroll + list_height) // self.ROW_HEIGHT + 1)
+        y_offset = self.LIST_TOP + first * self.ROW_HEIGHT - self.scroll
+        for skill in self._rows[first:last]:
+            skill_name = skill.name if skill.name else "empty"
+            surface.blit(text_layout.render(font_skill, skill_name, WHITE), (10, y_offset))
+            y_offset += self.ROW_HEIGHT
+        surface.set_clip(None)
+
+        # Scrollbar when the list does not fit
+        max_scroll = self._max_scroll()
+        if max_scroll:
+            bar_h = max(20, list_height * list_height // (list_height + max_scroll))
+            bar_y = self.LIST_TOP + (list_height - bar_h) * self.scroll // max_scroll
+            pygame.draw.rect(surface, (90, 90, 90), (self.PANEL_WIDTH - 8, bar_y, 4, bar_h))
+
+        title_surface = text_layout.render(get_font(24), f"Path {path.id}", WHITE)
+        surface.blit(title_surface, (10, 10))
+        pygame.draw.rect(surface, WHITE, surface.get_rect(), 2)
+        return surface
 
 def recalculate_paths_for_path(path_to_check, all_connections, all_paths):
-    skills_in_path = list(path_to_check.skills)
+    skills_in_path = sorted(path_to_check.skills, key=lambda s: s.id)
     if not skills_in_path:
         if path_to_check in all_paths:
             all_paths.remove(path_to_check)
         return
 
     remaining_skills_set = set(skills_in_path)
-    
-    # First component stays in the original path
-    q = [skills_in_path[0]]
-    visited = {skills_in_path[0]}
     path_to_check.skills.clear()
-    path_to_check.add_skill(skills_in_path[0])
-    remaining_skills_set.remove(skills_in_path[0])
-
-    head = 0
-    while head < len(q):
-        current_skill = q[head]
-        head += 1
-        
-        for s1, s2 in all_connections:
-            neighbor = None
-            if s1 == current_skill and s2 in remaining_skills_set:
-                neighbor = s2
-            elif s2 == current_skill and s1 in remaining_skills_set:
-                neighbor = s1
-            
-            if neighbor and neighbor not in visited:
-                visited.add(neighbor)
-                q.append(neighbor)
-                path_to_check.add_skill(neighbor)
-                remaining_skills_set.remove(neighbor)
-
-    while remaining_skills_set:
-        new_path = Path()
-        all_paths.append(new_path)
-        
-        start_node = remaining_skills_set.pop()
-        q_new = [start_node]
-        visited_new = {start_node}
-        new_path.add_skill(start_node)
-
-        head_new = 0
-        while head_new < len(q_new):
-            current_skill = q_new[head_new]
-            head_new += 1
-
-            for s1, s2 in all_connections:
-                neighbor = None
-                if s1 == current_skill and s2 in remaining_skills_set:
-                    neighbor = s2
-                elif s2 == current_skill and s1 in remaining_skills_set:
-                    neighbor = s1
-
-                if neighbor and neighbor not in visited_new:
-                    visited_new.add(neighbor)
-                    q_new.append(neighbor)
-                    new_path.add_skill(neighbor)
+    path_to_check.version += 1
+
+    # First component stays in the original path, the rest get new ones, in
+    # id order: membership order differs after a snapshot reload, ids do not,
+    # so a journal replay splits the same way
+    target_path = path_to_check
+    start_node = skills_in_path[0]
+    next_start = 1
+    while True:
+        remaining_skills_set.discard(start_node)
+        target_path.add_skill(start_node)
+        q = [start_node]
+        head = 0
+        while head < len(q):
+            current_skill = q[head]
+            head += 1
+
+            for neighbor in all_connections.neighbors(current_skill):
+                if neighbor in remaining_skills_set:
                     remaining_skills_set.remove(neighbor)
-
-def export_to_csv(filename, skills, paths, connections):
+                    q.append(neighbor)
+                    target_path.add_skill(neighbor)
+
+        if not remaining_skills_set:
+            break
+        target_path = Path()
+        all_paths.append(target_path)
+        while skills_in_path[next_start] not in remaining_skills_set:
+            next_start += 1
+        start_node = skills_in_path[next_start]
+
+# --- Incremental connectivity: every Path is one connected component ---
+
+def link_skills(a, b, connections, paths):
+    # Union by size: the smaller path is relabelled into the larger one, and
+    # the merged path keeps the colour of the path the link started from.
+    connections.add_edge(a, b)
+    path_a, path_b = a.path, b.path
+    if path_a and path_b:
+        if path_a is not path_b:
+            color = path_a.color
+            big, small = (path_a, path_b) if len(path_a.skills) >= len(path_b.skills) else (path_b, path_a)
+            big.merge_path(small)
+            big.color = color
+            if small in paths:
+                paths.remove(small)
+    elif path_a:
+        path_a.add_skill(b)
+    elif path_b:
+        path_b.add_skill(a)
+    else:
+        new_path = Path()
+        new_path.add_skill(a)
+        new_path.add_skill(b)
+        paths.append(new_path)
+
+def _split_if_disconnected(a, b, connections, paths):
+    # Called after the edge a-b is gone. Searches from both ends one node at
+    # a time: if the searches meet, nothing split; otherwise the side that
+    # runs out first is the smaller component and only it is relabelled.
+    seen = ({a}, {b})
+    queues = ([a], [b])
+    heads = [0, 0]
+    side = 0
+    while heads[side] < len(queues[side]):
+        q = queues[side]
+        u = q[heads[side]]
+        heads[side] += 1
+        mine, theirs = seen[side], seen[1 - side]
+        for v in connections.neighbors(u):
+            if v in theirs:
+                return
+            if v not in mine:
+                mine.add(v)
+                q.append(v)
+        side = 1 - side
+
+    new_path = Path()
+    for s in queues[side]:
+        old_path = s.path
+        if old_path:
+            old_path.remove_skill(s)
+            if not old_path.skills and old_path in paths:
+                paths.remove(old_path)
+        new_path.add_skill(s)
+    paths.append(new_path)
+
+def unlink_skills(a, b, connections, paths):
+    if connections.remove_edge(a, b):
+        _split_if_disconnected(a, b, connections, paths)
+
+def _isolate_skill(skill, connections, paths):
+    neighbours = list(connections.neighbors(skill))
+    for other in neighbours:
+        unlink_skills(skill, other, connections, paths)
+    return bool(neighbours)
+
+def delete_skill(skill, skills, connections, paths):
+    skills.remove(skill)
+    _isolate_skill(skill, connections, paths)
+    connections.remove_skill(skill)
+    path = skill.path
+    if path:
+        path.remove_skill(skill)
+        if not path.skills and path in paths:
+            paths.remove(path)
+
+def detach_skill(skill, connections, paths):
+    had_conn = _isolate_skill(skill, connections, paths)
+    path = skill.path
+    if had_conn and path and len(path.skills) > 1:
+        path.remove_skill(skill)
+        new_path = Path()
+        new_path.add_skill(skill)
+        paths.append(new_path)
+
+# --- Bulk operations: one pass over the selection, one split per affected path ---
+
+def delete_skills(selected, skills, connections, paths):
+    selected = dict.fromkeys(selected)
+    skills[:] = [s for s in skills if s not in selected]
+    affected = {}
+    for s in selected:
+        connections.remove_skill(s)
+        path = s.path
+        if path:
+            path.remove_skill(s)
+            affected[path] = None
+    for path in affected:
+        recalculate_paths_for_path(path, connections, paths)
+
+def detach_skills(selected, connections, paths):
+    affected = {}
+    for s in selected:
+        if connections.remove_skill(s):
+            path = s.path
+            if path and len(path.skills) > 1:
+                path.remove_skill(s)
+                affected[path] = None
+                new_path = Path()
+                new_path.add_skill(s)
+                paths.append(new_path)
+    for path in affected:
+        recalculate_paths_for_path(path, connections, paths)
+
+def move_skills(selected, dx, dy):
+    for s in selected:
+        s.x += dx
+        s.y += dy
+
+CSV_GZIP_LEVEL = 6 # .csv.gz: most of the size win of 9 at a fraction of the time
+
+def _is_gzip(filename):
+    return filename.lower().endswith('.gz')
+
+def export_to_csv(filename, skills, paths, connections, progress=None):
     # Asegura que exportamos TODOS los paths realmente referenciados por skills
     paths_by_id = {p.id: p for p in paths}
     for s in skills:
         if s.path:
             paths_by_id[s.path.id] = s.path  # Incluye paths que no estén en la lista 'paths'
+    total_rows = max(1, len(skills) + len(connections))
 
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
+    if _is_gzip(filename):
+        f = gzip.open(filename, 'wt', compresslevel=CSV_GZIP_LEVEL, newline='', encoding='utf-8')
+    else:
+        f = open(filename, 'w', newline='', encoding='utf-8')
+    with f:
         w = csv.writer(f)
         w.writerow(['type','id','name','x','y','radius','path_id','path_color','edge_from','edge_to'])
 
@@ -321,7 +1572,9 @@ def export_to_csv(filename, skills, paths, connections):
             w.writerow(['path', p.id, '', '', '', '', '', color, '', ''])
 
         # Skills (si no tienen path, crea uno para no dejar path_id vacío)
-        for s in skills:
+        for i, s in enumerate(skills):
+            if progress and i % 1000 == 0:
+                progress(i, i / total_rows)
             if s.path is None:
                 # Crea un path ad-hoc para que no queden skills huérfanas
                 new_p = Path()
@@ -331,140 +1584,670 @@ def export_to_csv(filename, skills, paths, connections):
             w.writerow(['skill', s.id, s.name, f'{s.x:.3f}', f'{s.y:.3f}', s.original_radius, pid, '', '', ''])
 
         # Edges
-        for a, b in connections:
+        for i, (a, b) in enumerate(connections, len(skills)):
+            if progress and i % 1000 == 0:
+                progress(i, i / total_rows)
             w.writerow(['edge', '', '', '', '', '', '', '', a.id, b.id])
 
+    if progress:
+        progress(total_rows, 1.0)
+
+
+
+IMPORT_PROGRESS_ROWS = 50000 # rows between progress reports
+
+def print_import_progress(rows_read, fraction):
+    if fraction >= 1.0 or rows_read % IMPORT_PROGRESS_ROWS == 0:
+        print(f"[..] Importing: {rows_read} rows ({fraction:.0%})")
 
+def _parse_color(col):
+    parts = col.split(';') if col else ()
+    if len(parts) == 3:
+        try:
+            return tuple(int(x) for x in parts)
+        except ValueError:
+            pass
+    return None
 
-def import_from_csv(filename):
+def import_from_csv(filename, progress=print_import_progress, unmeasured=None):
+    # Single streaming pass: rows are handled as they are read. Skills that
+    # name a path not seen yet and edges that name a skill not seen yet are
+    # buffered until the end. Path membership is repaired with union-find.
+    # Given an unmeasured list, skills with no saved radius start at
+    # MIN_RADIUS and are appended to it instead of measuring their names
+    # (fonts belong to the render thread when loading in the background).
     skills = []
     paths = []
-    connections = []
+    connections = SkillGraph()
     skill_by_id = {}
     path_by_id = {}
+    index_of = {} # skill -> position in skills, for the union-find arrays
+    parent = []
+    waiting_for_path = {} # path id -> skills that referenced it early
+    pending_edges = []    # (from id, to id) seen before one of their skills
+    unplaced = []         # skills with no saved coordinates
     # Reset contadores
     Skill.next_id = 0
     Path.next_id = 0
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        r = csv.DictReader(f)
-        rows = list(r)
-    print(rows)
-    # Paths primero
-    for row in rows:
-        if row['type'] == 'path':
-            p = Path()
-            p.id = int(row['id'])
-            Path.next_id = max(Path.next_id, p.id + 1)
-            col = row.get('path_color','')
-            if col and ';' in col:
-                parts = col.split(';')
-                if len(parts) == 3:
-                    try:
-                        p.color = tuple(int(x) for x in parts)
-                        print(p.color)
-                    except:
-                        print("Im an error")
-                        pass
-                        
-            paths.append(p)
-            path_by_id[p.id] = p
-
-    # Luego skills
-    for row in rows:
-        if row['type'] == 'skill':
-            s = Skill(float(row['x']), float(row['y']), row['name'])
-            s.id = int(row['id'])
-            Skill.next_id = max(Skill.next_id, s.id + 1)
-            s.original_radius = int(row['radius']) if row['radius'] else s.original_radius
-            pid = row['path_id']
-            if pid != '' and int(pid) in path_by_id:
-                path_by_id[int(pid)].add_skill(s)
-            skills.append(s)
-            skill_by_id[s.id] = s
-
-    # Finalmente edges
-    for row in rows:
-        if row['type'] == 'edge':
-            a = skill_by_id.get(int(row['edge_from']))
-            b = skill_by_id.get(int(row['edge_to']))
-            if a and b:
-                connections.append((a, b))
-
-        # --- Reparación de pertenencia a paths tras la carga ---
-
-    # 1) Propaga paths por las aristas (si alguno del componente tiene path)
-    changed = True
-    while changed:
-        changed = False
-        for a, b in connections:
-            if a.path and not b.path:
-                a.path.add_skill(b); changed = True
-            elif b.path and not a.path:
-                b.path.add_skill(a); changed = True
-
-    # 2) Para componentes sin path asignado, asígnales uno reutilizando
-    #    paths que llegaron del CSV (con sus colores) y que aún no tengan skills.
-    unused_paths = [p for p in paths if not p.skills]
-
-    # Detecta componentes restantes sin path
-    unassigned = [s for s in skills if s.path is None]
-    seen = set()
-    for start in unassigned:
-        if start in seen:
-            continue
-
-        # BFS para obtener todo el componente
-        comp = []
-        q = [start]
-        seen.add(start)
-        while q:
-            u = q.pop()
-            comp.append(u)
-            for x, y in connections:
-                if x == u and y not in seen:
-                    seen.add(y); q.append(y)
-                elif y == u and x not in seen:
-                    seen.add(x); q.append(x)
-
-        # Asigna un path (reusa uno con color si hay; si no, crea uno)
-        if unused_paths:
-            p = unused_paths.pop(0)
-        else:
-            p = Path()  # tendrá color aleatorio de PATH_COLORS
-            paths.append(p)
-        for s in comp:
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def link(a, b):
+        if connections.add_edge(a, b):
+            ra, rb = find(index_of[a]), find(index_of[b])
+            if ra != rb:
+                parent[rb] = ra
+
+    total_size = max(1, os.path.getsize(filename))
+    rows_read = 0
+
+    # Progress is the position in the file on disk, compressed or not
+    with open(filename, 'rb') as raw:
+        f = io.TextIOWrapper(gzip.GzipFile(fileobj=raw) if _is_gzip(filename) else raw,
+                             encoding='utf-8', newline='')
+        r = csv.reader(f)
+        header = next(r, [])
+        width = len(header)
+        col = {name: i for i, name in enumerate(header)}
+        c_type, c_id, c_name = col['type'], col['id'], col['name']
+        c_x, c_y, c_radius, c_path = col['x'], col['y'], col['radius'], col['path_id']
+        c_color, c_from, c_to = col['path_color'], col['edge_from'], col['edge_to']
+
+        for row in r:
+            rows_read += 1
+            if progress and rows_read % 1000 == 0:
+                progress(rows_read, min(1.0, raw.tell() / total_size) * 0.99)
+            if len(row) < width:
+                row += [''] * (width - len(row))
+            kind = row[c_type]
+
+            if kind == 'skill':
+                radius = row[c_radius]
+                x, y = row[c_x], row[c_y]
+                if radius:
+                    s = Skill(float(x or 0), float(y or 0), row[c_name], int(radius))
+                elif unmeasured is not None:
+                    s = Skill(float(x or 0), float(y or 0), row[c_name], MIN_RADIUS)
+                    unmeasured.append(s)
+                else:
+                    s = Skill(float(x or 0), float(y or 0), row[c_name])
+                if not (x and y):
+                    unplaced.append(s)
+                s.id = int(row[c_id])
+                Skill.next_id = max(Skill.next_id, s.id + 1)
+                pid = row[c_path]
+                if pid != '':
+                    pid = int(pid)
+                    if pid in path_by_id:
+                        path_by_id[pid].add_skill(s)
+                    else:
+                        waiting_for_path.setdefault(pid, []).append(s)
+                index_of[s] = len(skills)
+                parent.append(len(skills))
+                skills.append(s)
+                skill_by_id[s.id] = s
+
+            elif kind == 'edge':
+                a_id, b_id = int(row[c_from]), int(row[c_to])
+                a = skill_by_id.get(a_id)
+                b = skill_by_id.get(b_id)
+                if a and b:
+                    link(a, b)
+                else:
+                    pending_edges.append((a_id, b_id))
+
+            elif kind == 'path':
+                p = Path(_parse_color(row[c_color]))
+                p.id = int(row[c_id])
+                Path.next_id = max(Path.next_id, p.id + 1)
+                paths.append(p)
+                path_by_id[p.id] = p
+                for s in waiting_for_path.pop(p.id, ()):
+                    p.add_skill(s)
+
+    # Forward references; ids that never showed up are dropped
+    for a_id, b_id in pending_edges:
+        a = skill_by_id.get(a_id)
+        b = skill_by_id.get(b_id)
+        if a and b:
+            link(a, b)
+
+    # --- Reparación de pertenencia a paths tras la carga ---
+    # Each component takes the path of its first assigned skill; components
+    # with none reuse the CSV's paths that ended up empty (keeping their
+    # colours), then fresh ones.
+    component_path = {}
+    for i, s in enumerate(skills):
+        if s.path:
+            component_path.setdefault(find(i), s.path)
+    unused_paths = iter([p for p in paths if not p.skills])
+    for i, s in enumerate(skills):
+        if s.path is None:
+            root = find(i)
+            p = component_path.get(root)
+            if p is None:
+                p = next(unused_paths, None)
+                if p is None:
+                    p = Path()  # tendrá color aleatorio de PATH_COLORS
+                    paths.append(p)
+                component_path[root] = p
             p.add_skill(s)
 
+    # Generated files may leave x/y blank: scatter those skills (through the
+    # random module, so a seeded run places them the same way every time)
+    half = math.sqrt(len(skills)) * PLACEMENT_SPACING / 2
+    for s in unplaced:
+        s.x = random.uniform(-half, half)
+        s.y = random.uniform(-half, half)
 
+    if progress:
+        progress(rows_read, 1.0)
     return skills, paths, connections
 
-def ensure_csv(name: str) -> str:
-    return name if name.lower().endswith(".csv") else name + ".csv"
+# --- Formato binario (.stb) ---
+# Little-endian, every section padded to 4 bytes:
+#   header   magic, version, skill/path/edge counts, palette size, name bytes
+#   palette  uint8 r,g,b,pad per distinct path colour
+#   paths    int32 id[n_paths], int32 palette index[n_paths]
+#   skills   int32 id[n], float32 x[n], float32 y[n], int32 radius[n],
+#            int32 path index[n] (-1 = none), uint32 name offset[n + 1]
+#   names    utf-8 string table
+#   edges    int32 (from, to) skill index pairs[n_edges]
+STB_MAGIC = b'STB\0'
+STB_VERSION = 1
+STB_EXTENSION = '.stb'
+_STB_HEADER = struct.Struct('<4sHHIIIII')
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+def _write_column(f, code, values):
+    col = array(code, values)
+    if sys.byteorder != 'little':
+        col.byteswap()
+    col.tofile(f)
+
+def _read_column(mm, offset, code, count):
+    # Bulk conversion from the mapping; the views are released before returning
+    size = array(code).itemsize * count
+    if offset + size > len(mm):
+        raise ValueError("truncated skill tree file")
+    if sys.byteorder == 'little':
+        with memoryview(mm) as buf, buf[offset:offset + size] as raw, raw.cast(code) as col:
+            return col.tolist(), offset + size
+    col = array(code, mm[offset:offset + size])
+    col.byteswap()
+    return col.tolist(), offset + size
+
+def export_to_stb(filename, skills, paths, connections):
+    paths_by_id = {p.id: p for p in paths}
+    for s in skills:
+        if s.path is None:
+            new_p = Path()
+            new_p.add_skill(s)
+        paths_by_id[s.path.id] = s.path
+    path_list = list(paths_by_id.values())
+    path_index = {p: i for i, p in enumerate(path_list)}
+
+    palette = {}
+    path_colors = [palette.setdefault(tuple(p.color), len(palette)) for p in path_list]
+
+    names = [s.name.encode('utf-8') for s in skills]
+    offsets = [0]
+    for b in names:
+        offsets.append(offsets[-1] + len(b))
+    name_blob = b''.join(names)
+
+    skill_index = {s: i for i, s in enumerate(skills)}
+    edge_pairs = []
+    for a, b in connections:
+        edge_pairs.append(skill_index[a])
+        edge_pairs.append(skill_index[b])
+
+    with open(filename, 'wb') as f:
+        f.write(_STB_HEADER.pack(STB_MAGIC, STB_VERSION, 0, len(skills), len(path_list),
+                                 len(connections), len(palette), len(name_blob)))
+        f.write(b''.join(bytes((r, g, b, 0)) for r, g, b in palette))
+        _write_column(f, 'i', [p.id for p in path_list])
+        _write_column(f, 'i', path_colors)
+        _write_column(f, 'i', [s.id for s in skills])
+        _write_column(f, 'f', [s.x for s in skills])
+        _write_column(f, 'f', [s.y for s in skills])
+        _write_column(f, 'i', [int(s.original_radius) for s in skills])
+        _write_column(f, 'i', [path_index[s.path] for s in skills])
+        _write_column(f, 'I', offsets)
+        f.write(name_blob)
+        f.write(bytes(_pad4(len(name_blob)) - len(name_blob)))
+        _write_column(f, 'i', edge_pairs)
+
+def import_from_stb(filename, progress=print_import_progress, unmeasured=None):
+    # Columns are converted in bulk straight out of the mapped file; the only
+    # per-skill work left is building the Skill objects themselves. A radius
+    # of 0 marks a skill whose name was never measured (autosave snapshots
+    # written while loading) and is treated like a blank CSV radius.
+    skills = []
+    paths = []
+    connections = SkillGraph()
+    Skill.next_id = 0
+    Path.next_id = 0
 
-def ask_save_csv(default_name="skill_tree.csv"):
-    root = tk.Tk(); root.withdraw()
-    try:
-        path = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv")],
-            initialfile=default_name,
-            title="Save skill tree as..."
-        )
-        return ensure_csv(path) if path else None
-    finally:
-        root.destroy()
-
-def ask_open_csv():
-    root = tk.Tk(); root.withdraw()
-    try:
-        path = filedialog.askopenfilename(
-            filetypes=[("CSV files", "*.csv")],
-            title="Open skill tree..."
-        )
-        return path if path else None
-    finally:
-        root.destroy()
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _STB_HEADER.size:
+            raise ValueError(f"{filename}: truncated skill tree file")
+        magic, version, _, n, n_paths, n_edges, n_colors, name_bytes = _STB_HEADER.unpack_from(mm)
+        if magic != STB_MAGIC:
+            raise ValueError(f"{filename}: not a skill tree file")
+        if version != STB_VERSION:
+            raise ValueError(f"{filename}: unsupported format version {version}")
+
+        off = _STB_HEADER.size
+        palette = mm[off:off + 4 * n_colors]
+        colors = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 4)]
+        off += 4 * n_colors
+        path_ids, off = _read_column(mm, off, 'i', n_paths)
+        path_colors, off = _read_column(mm, off, 'i', n_paths)
+        ids, off = _read_column(mm, off, 'i', n)
+        xs, off = _read_column(mm, off, 'f', n)
+        ys, off = _read_column(mm, off, 'f', n)
+        radii, off = _read_column(mm, off, 'i', n)
+        path_of, off = _read_column(mm, off, 'i', n)
+        offsets, off = _read_column(mm, off, 'I', n + 1)
+        names = mm[off:off + name_bytes]
+        off += _pad4(name_bytes)
+        edge_pairs, off = _read_column(mm, off, 'i', 2 * n_edges)
+
+    for i in range(n_paths):
+        p = Path(colors[path_colors[i]])
+        p.id = path_ids[i]
+        paths.append(p)
+    Path.next_id = max((p.id + 1 for p in paths), default=0)
+
+    for i in range(n):
+        name = names[offsets[i]:offsets[i + 1]].decode('utf-8')
+        if radii[i]:
+            s = Skill(xs[i], ys[i], name, radii[i])
+        elif unmeasured is not None:
+            s = Skill(xs[i], ys[i], name, MIN_RADIUS)
+            unmeasured.append(s)
+        else:
+            s = Skill(xs[i], ys[i], name)
+        s.id = ids[i]
+        if path_of[i] >= 0:
+            paths[path_of[i]].add_skill(s)
+        skills.append(s)
+        if progress and (i + 1) % 1000 == 0:
+            progress(i + 1, (i + 1) / n)
+    Skill.next_id = max((s.id + 1 for s in skills), default=0)
+
+    for i in range(0, 2 * n_edges, 2):
+        connections.add_edge(skills[edge_pairs[i]], skills[edge_pairs[i + 1]])
+
+    if progress:
+        progress(n, 1.0)
+    return skills, paths, connections
+
+def save_tree(filename, skills, paths, connections, progress=None):
+    # The binary format is written column by column and has no progress to report
+    if filename.lower().endswith(STB_EXTENSION):
+        export_to_stb(filename, skills, paths, connections)
+    else:
+        export_to_csv(filename, skills, paths, connections, progress)
+
+def load_tree(filename, progress=print_import_progress, unmeasured=None):
+    if filename.lower().endswith(STB_EXTENSION):
+        return import_from_stb(filename, progress, unmeasured)
+    return import_from_csv(filename, progress, unmeasured)
+
+# --- Autosave: snapshot + journal de operaciones ---
+# Every mutation main() performs is appended to the journal as one CSV line,
+# so writing costs the size of the change, not of the tree. Every
+# JOURNAL_COMPACT_RECORDS records the tree is written to a fresh snapshot and
+# the journal restarts. The journal's first line names the snapshot it
+# extends; a crash between the two writes just leaves the older, still
+# consistent pair in place.
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".skill_tree_autosave")
+JOURNAL_COMPACT_RECORDS = 5000
+_JOURNAL_NAME = "journal.csv"
+# op -> number of fields; any extra fields are the colours of the paths the
+# operation created, in creation order
+_JOURNAL_ARITY = {'create': 3, 'link': 2, 'rename': 2, 'move': 3, 'delete': 1, 'detach': 1,
+                  'delete_many': 1, 'detach_many': 1, 'move_many': 3} # *_many: ids joined with ';'
+
+def journal_ids(skills):
+    return ';'.join(str(s.id) for s in skills)
+
+class Journal:
+    def __init__(self, directory=None):
+        self.directory = directory or AUTOSAVE_DIR
+        self.generation = 0
+        self.records = 0
+        self._file = None
+        self._writer = None
+        self._path_mark = Path.next_id
+        self._renamed = {} # skills whose name changed since the last flush
+
+    def _snapshot_path(self, generation):
+        return os.path.join(self.directory, f"snapshot-{generation}{STB_EXTENSION}")
+
+    def _open_log(self):
+        self._file = open(os.path.join(self.directory, _JOURNAL_NAME), 'a', newline='', encoding='utf-8', buffering=1)
+        self._writer = csv.writer(self._file, lineterminator='\n')
+
+    def recover(self):
+        # Snapshot + journal replay. Returns the tree (empty on first run).
+        os.makedirs(self.directory, exist_ok=True)
+        skills, paths, connections = [], [], SkillGraph()
+        log_path = os.path.join(self.directory, _JOURNAL_NAME)
+        rows = []
+        if os.path.exists(log_path):
+            with open(log_path, 'r', newline='', encoding='utf-8') as f:
+                r = csv.reader(f)
+                header = next(r, None)
+                if header and header[0] == 'snapshot':
+                    self.generation = int(header[1])
+                    rows = list(r)
+        snapshot = self._snapshot_path(self.generation)
+        if os.path.exists(snapshot):
+            skills, paths, connections = import_from_stb(snapshot, progress=None)
+
+        skill_by_id = {s.id: s for s in skills}
+        for row in rows:
+            try:
+                self._apply(row, skills, paths, connections, skill_by_id)
+            except (KeyError, ValueError, IndexError):
+                continue # torn last line after a crash, or a record for a skill already gone
+        self.records = len(rows)
+        self._path_mark = Path.next_id
+        if self.records >= JOURNAL_COMPACT_RECORDS or not os.path.exists(log_path):
+            self.compact(skills, paths, connections)
+        else:
+            self._open_log()
+        return skills, paths, connections
+
+    def _apply(self, row, skills, paths, connections, skill_by_id):
+        op = row[0]
+        arity = _JOURNAL_ARITY[op]
+        args, colors = row[1:1 + arity], row[1 + arity:]
+        mark = Path.next_id
+        if op == 'create':
+            s = Skill(float(args[1]), float(args[2]))
+            s.id = int(args[0])
+            Skill.next_id = max(Skill.next_id, s.id + 1)
+            skills.append(s)
+            connections.add_skill(s)
+            skill_by_id[s.id] = s
+            p = Path()
+            p.add_skill(s)
+            paths.append(p)
+        elif op == 'link':
+            link_skills(skill_by_id[int(args[0])], skill_by_id[int(args[1])], connections, paths)
+        elif op == 'rename':
+            s = skill_by_id[int(args[0])]
+            s.name = args[1]
+            s._update_radius()
+            if s.path:
+                s.path.version += 1
+        elif op == 'move':
+            s = skill_by_id[int(args[0])]
+            s.x, s.y = float(args[1]), float(args[2])
+        elif op == 'delete':
+            delete_skill(skill_by_id.pop(int(args[0])), skills, connections, paths)
+        elif op == 'detach':
+            detach_skill(skill_by_id[int(args[0])], connections, paths)
+        elif op == 'delete_many':
+            delete_skills([skill_by_id.pop(int(i)) for i in args[0].split(';')], skills, connections, paths)
+        elif op == 'detach_many':
+            detach_skills([skill_by_id[int(i)] for i in args[0].split(';')], connections, paths)
+        elif op == 'move_many':
+            move_skills([skill_by_id[int(i)] for i in args[0].split(';')], float(args[1]), float(args[2]))
+        # Paths created by the operation get back their recorded colours
+        created = sorted((p for p in paths if p.id >= mark), key=lambda p: p.id)
+        for p, col in zip(created, colors):
+            p.color = _parse_color(col) or p.color
+
+    def renamed(self, skill):
+        self._renamed[skill] = None
+
+    def flush_renames(self):
+        renamed, self._renamed = self._renamed, {}
+        for s in renamed:
+            self._write(['rename', s.id, s.name])
+
+    def record(self, op, *fields, paths=()):
+        # Call right after the mutation; paths lets it pick up new path colours
+        created = []
+        for p in reversed(paths): # new paths are always appended
+            if p.id < self._path_mark:
+                break
+            created.append(p)
+        created.sort(key=lambda p: p.id)
+        self._path_mark = Path.next_id
+        self.flush_renames()
+        self._write([op, *fields, *(';'.join(map(str, p.color)) for p in created)])
+
+    def _write(self, row):
+        self._writer.writerow(row)
+        self.records += 1
+
+    @property
+    def needs_compaction(self):
+        return self.records >= JOURNAL_COMPACT_RECORDS
+
+    def write_snapshot(self, skills, paths, connections):
+        # Safe off the render thread for a tree nothing else touches yet; the
+        # file only becomes the snapshot once compact() is handed it
+        written = os.path.join(self.directory, "snapshot-next" + STB_EXTENSION + ".tmp")
+        export_to_stb(written, skills, paths, connections)
+        return written
+
+    def compact(self, skills, paths, connections, written=None):
+        # written: the same tree from write_snapshot(), so only renames are left
+        self._renamed.clear() # the snapshot has the current names
+        generation = self.generation + 1
+        snapshot = self._snapshot_path(generation)
+        if written is None:
+            written = snapshot + ".tmp"
+            export_to_stb(written, skills, paths, connections)
+        os.replace(written, snapshot)
+
+        log_path = os.path.join(self.directory, _JOURNAL_NAME)
+        with open(log_path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, lineterminator='\n').writerow(['snapshot', generation])
+        if self._file:
+            self._file.close()
+        os.replace(log_path + ".tmp", log_path)
+
+        old = self._snapshot_path(self.generation)
+        if os.path.exists(old):
+            os.remove(old)
+        self.generation = generation
+        self.records = 0
+        self._path_mark = Path.next_id
+        self._open_log()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+TREE_FILETYPES = [("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz"), ("Binary skill tree", "*" + STB_EXTENSION)]
+TREE_EXTENSIONS = (".csv", ".csv.gz", STB_EXTENSION)
+
+def ensure_tree_ext(name: str) -> str:
+    return name if name.lower().endswith(TREE_EXTENSIONS) else name + ".csv"
+
+# The Tk dialogs run in a child process: they block only the thread that
+# waits for them, and Tk never shares a process with SDL's window.
+_DIALOG_SCRIPT = """
+import sys, json
+import tkinter as tk
+from tkinter import filedialog
+kind, options = sys.argv[1], json.loads(sys.argv[2])
+options["filetypes"] = [tuple(t) for t in options["filetypes"]]
+root = tk.Tk(); root.withdraw()
+root.attributes("-topmost", True)
+ask = filedialog.asksaveasfilename if kind == "save" else filedialog.askopenfilename
+sys.stdout.buffer.write((ask(parent=root, **options) or "").encode("utf-8"))
+"""
+
+def _run_dialog(kind, **options):
+    proc = subprocess.run([sys.executable, "-c", _DIALOG_SCRIPT, kind, json.dumps(options)], capture_output=True)
+    if proc.returncode:
+        reason = proc.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise OSError(f"file dialog failed: {reason[-1] if reason else proc.returncode}")
+    return proc.stdout.decode("utf-8").strip() or None
+
+def ask_save_tree(default_name="skill_tree.csv"):
+    path = _run_dialog("save", defaultextension=".csv", filetypes=TREE_FILETYPES,
+                       initialfile=default_name, title="Save skill tree as...")
+    return ensure_tree_ext(path) if path else None
+
+def ask_open_tree():
+    patterns = " ".join("*" + ext for ext in TREE_EXTENSIONS)
+    return _run_dialog("open", filetypes=[("Skill trees", patterns)] + TREE_FILETYPES,
+                       title="Open skill tree...")
+
+# --- Guardar/abrir en segundo plano ---
+# One save or open at a time runs on a worker thread: the dialog, then the
+# file. Saving writes a snapshot taken on the render thread, so the tree
+# can keep changing meanwhile; opening builds a whole new tree that main()
+# swaps in when poll() hands it over. The worker only ever writes plain
+# attributes (label, fraction) that the render thread reads.
+PROGRESS_RECT = (WIDTH // 2 - 200, HEIGHT - 70, 400, 40)
+
+class _SavedSkill:
+    __slots__ = ('id', 'name', 'x', 'y', 'original_radius', 'path')
+
+class _SavedPath:
+    __slots__ = ('id', 'color')
+
+def snapshot_tree(skills, paths, connections):
+    # Plain copies of what the exporters read, in the same shapes
+    saved_paths = {}
+    def saved(p):
+        c = saved_paths.get(p)
+        if c is None:
+            c = saved_paths[p] = _SavedPath()
+            c.id, c.color = p.id, p.color
+        return c
+    path_list = [saved(p) for p in paths]
+    saved_skills = {}
+    for s in skills:
+        if s.path is None: # as the exporters would, but here on the render thread
+            Path().add_skill(s)
+        c = saved_skills[s] = _SavedSkill()
+        c.id, c.name, c.x, c.y, c.original_radius, c.path = s.id, s.name, s.x, s.y, s.original_radius, saved(s.path)
+    edges = [(saved_skills[a], saved_skills[b]) for a, b in connections]
+    return list(saved_skills.values()), path_list, edges
+
+class TreeIO:
+    def __init__(self, journal=None):
+        self.journal = journal # an opened tree's autosave snapshot is written here too
+        self.kind = None # 'save' or 'open' while busy
+        self.label = "" # set once the dialog is answered and the file work starts
+        self.fraction = 0.0
+        self._thread = None
+        self._result = None
+        self._counters = None # Skill/Path id counters from before an open
+
+    @property
+    def busy(self):
+        return self._thread is not None
+
+    def save(self, skills, paths, connections, default_name):
+        self._start('save', self._save, snapshot_tree(skills, paths, connections), default_name)
+
+    def open(self):
+        # The loaders renumber Skill and Path ids from zero; unless the new
+        # tree is swapped in, the current tree's counters come back
+        self._counters = (Skill.next_id, Path.next_id)
+        self._start('open', self._open)
+
+    def _start(self, kind, target, *args):
+        self.kind, self.label, self.fraction, self._result = kind, "", 0.0, None
+        self._thread = threading.Thread(target=self._run, args=(target,) + args, name="tree-io", daemon=True)
+        self._thread.start()
+
+    def _run(self, target, *args):
+        # Whatever a damaged file raises (a short .stb header, a cut-off .gz
+        # stream, ...) is reported; an uncaught one would read as a cancel
+        try:
+            self._result = target(*args)
+        except Exception as e:
+            self._result = ('error', self.kind, e)
+
+    def _progress(self, rows, fraction):
+        self.fraction = fraction
+
+    def _save(self, snapshot, default_name):
+        fname = ask_save_tree(default_name)
+        if not fname:
+            return None
+        self.label = f"Saving {os.path.basename(fname)}"
+        # Written beside the target and renamed, so a failed save leaves the old file whole
+        tmp = fname + ".tmp" + os.path.splitext(fname)[1]
+        try:
+            save_tree(tmp, *snapshot, progress=self._progress)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, fname)
+        return ('saved', fname)
+
+    def _open(self):
+        fname = ask_open_tree()
+        if not fname:
+            return None
+        self.label = f"Loading {os.path.basename(fname)}"
+        unmeasured = []
+        tree = load_tree(fname, self._progress, unmeasured)
+        snapshot = None
+        if self.journal:
+            # The new tree is still this thread's alone, so the autosave
+            # snapshot is written now rather than on the render thread once
+            # it is swapped in. Names are measured there, so the snapshot
+            # marks them unmeasured and recovery measures them again.
+            for s in unmeasured:
+                s.original_radius = 0
+            try:
+                snapshot = self.journal.write_snapshot(*tree)
+            except OSError:
+                pass # compact() then writes it on the render thread as before
+            for s in unmeasured:
+                s.original_radius = MIN_RADIUS
+        return ('loaded', fname, tree, unmeasured, snapshot)
+
+    def poll(self):
+        # Render thread, once a frame: the finished job's result; None while
+        # busy, and for a dialog that was cancelled
+        if self._thread is None or self._thread.is_alive():
+            return None
+        self._thread.join()
+        if self.kind == 'open' and not (self._result and self._result[0] == 'loaded'):
+            Skill.next_id, Path.next_id = self._counters
+        self._thread = self.kind = None
+        return self._result
+
+    def wait(self):
+        # On quit: a save in flight is finished, an open is abandoned
+        if self.kind == 'save':
+            self._thread.join()
+
+def draw_progress(screen, label, fraction):
+    rect = pygame.Rect(PROGRESS_RECT)
+    pygame.draw.rect(screen, DARK_GRAY, rect)
+    bar = rect.inflate(-8, -24).move(0, 8)
+    pygame.draw.rect(screen, WHITE, bar, 1)
+    pygame.draw.rect(screen, WHITE, (bar.x, bar.y, round(bar.width * min(1.0, fraction)), bar.height))
+    surf = get_font(18).render(f"{label}  {fraction:.0%}", True, WHITE)
+    screen.blit(surf, (rect.x + 4, rect.y + 3))
 
 def wrap_lines(lines, font, max_width):
     wrapped = []
@@ -473,7 +2256,7 @@ def wrap_lines(lines, font, max_width):
         cur = ""
         for w in words:
             test = (cur + " " + w).strip()
-            if font.size("• " + test)[0] <= max_width:
+            if text_layout.measure(font, "• " + test)[0] <= max_width:
                 cur = test
             else:
                 if cur:
@@ -484,72 +2267,982 @@ def wrap_lines(lines, font, max_width):
     return wrapped
 
 
-def draw_instructions_dropdown(screen, open_flag, pos=(10, 10), width=520):
-    import pygame
-    x, y = pos
-    pad = 10
-    gap_below_header = 8  # space between header and panel
-
-    title_font = pygame.font.Font(None, 28)
-    text_font  = pygame.font.Font(None, 22)
-
-    # Header
-    caret = "v" if open_flag else ">"
-    header_text = f"{caret} Instructions  (press H)"
-    header_surf = title_font.render(header_text, True, (255, 255, 255))
-    header_rect = header_surf.get_rect(topleft=(x, y))
-
-    # dark stripe behind header
-    bg = pygame.Surface((width, header_rect.height + 8), pygame.SRCALPHA)
-    bg.fill((0, 0, 0, 140))
-    screen.blit(bg, (x - 6, y - 4))
-    screen.blit(header_surf, header_rect.topleft)
-
-    if not open_flag:
-        return  # collapsed
-
-    # Use the same list for sizing and drawing
-    items = instructions  # if you add word-wrapping later, replace this with your wrapped list
-
-    # Use the same line height for sizing and stepping
-    line_h = text_font.get_height() + 6
-
-    # Panel geometry
-    panel_h = pad + len(items) * line_h + pad
-    panel_y = y + header_rect.height + gap_below_header
-
-    panel = pygame.Surface((width, panel_h), pygame.SRCALPHA)
-    panel.fill((0, 0, 0, 160))
-    screen.blit(panel, (x, panel_y))
-
-    # Draw lines
-    ty = panel_y + pad
-    for line in items:
-        surf = text_font.render("• " + line, True, (230, 230, 230))
-        screen.blit(surf, (x + pad, ty))
-        ty += text_font.get_height() + 8
-
+class InstructionsDropdown:
+    # Retained overlay: header and (when open) the instruction list are
+    # rendered once into a surface and rebuilt only when the open flag or
+    # the geometry changes.
+    def __init__(self):
+        self._key = None
+        self._surface = None
+        self._origin = (0, 0)
+
+    def draw(self, screen, open_flag, pos=(10, 10), width=520):
+        key = (open_flag, pos, width)
+        if key != self._key:
+            self._build(open_flag, pos, width)
+            self._key = key
+        screen.blit(self._surface, self._origin)
+
+    def _build(self, open_flag, pos, width):
+        x, y = pos
+        pad = 10
+        gap_below_header = 8  # space between header and panel
+
+        title_font = get_font(28)
+        text_font  = get_font(22)
+
+        # Header
+        caret = "v" if open_flag else ">"
+        header_surf = title_font.render(f"{caret} Instructions  (press H)", True, (255, 255, 255))
+        header_h = header_surf.get_height()
+
+        # Use the same line height for sizing and stepping
+        line_h = text_font.get_height() + 6
+        panel_h = pad + len(instructions) * line_h + pad
+        panel_y = y + header_h + gap_below_header
+
+        # Surface covers the header stripe (drawn 6px left, 4px above pos) and the panel
+        ox, oy = x - 6, y - 4
+        total_h = (panel_y + panel_h if open_flag else y + header_h + 4) - oy
+        surface = pygame.Surface((width + 6, total_h), pygame.SRCALPHA)
+
+        # dark stripe behind header
+        surface.fill((0, 0, 0, 140), pygame.Rect(0, 0, width, header_h + 8))
+        surface.blit(header_surf, (x - ox, y - oy))
+
+        if open_flag:
+            surface.fill((0, 0, 0, 160), pygame.Rect(x - ox, panel_y - oy, width, panel_h))
+            ty = panel_y + pad
+            for line in instructions:
+                surface.blit(text_font.render("• " + line, True, (230, 230, 230)), (x + pad - ox, ty - oy))
+                ty += line_h
+
+        self._surface = surface
+        self._origin = (ox, oy)
+
+
+def coalesce_motion(events):
+    # Keeps only the last of each run of MOUSEMOTIONs; drags and pans only need
+    # the latest position, and a button or key after a motion still sees it
+    kept = []
+    for event in events:
+        if kept and event.type == pygame.MOUSEMOTION and kept[-1].type == pygame.MOUSEMOTION:
+            kept[-1] = event
+        else:
+            kept.append(event)
+    return kept
+
+def lod_for_zoom(zoom):
+    if zoom >= LOD_TEXT_MIN_ZOOM:
+        return LOD_FULL
+    if zoom >= LOD_CIRCLE_MIN_ZOOM:
+        return LOD_CIRCLES
+    return LOD_PIXELS
+
+class SceneIndex:
+    # World-space buckets of skills and edges, rebuilt once per frame, so the
+    # render pass only looks at what overlaps the visible rectangle.
+    MAX_EDGE_CELLS = 16 # edges spanning more cells are checked individually
+
+    def __init__(self, cell_size=256):
+        self.cell_size = cell_size
+        self.node_cells = {}
+        self.edge_cells = {}
+        self.long_edges = []
+        self.max_radius = 0
+        self._source = None
+
+    def is_current(self, skills, connections):
+        return self._source == (skills, connections, connections.version)
+
+    def rebuild(self, skills, connections):
+        self._source = (skills, connections, connections.version)
+        inv = 1.0 / self.cell_size
+        floor = math.floor
+        node_cells = {}
+        max_radius = 0
+        for order, s in enumerate(skills):
+            key = (floor(s.x * inv), floor(s.y * inv))
+            cell = node_cells.get(key)
+            if cell is None:
+                node_cells[key] = [(order, s)]
+            else:
+                cell.append((order, s))
+            if s.original_radius > max_radius:
+                max_radius = s.original_radius
+
+        edge_cells = {}
+        long_edges = []
+        for edge in connections:
+            a, b = edge
+            ax, ay, bx, by = a.x, a.y, b.x, b.y
+            cx0, cx1 = floor(min(ax, bx) * inv), floor(max(ax, bx) * inv)
+            cy0, cy1 = floor(min(ay, by) * inv), floor(max(ay, by) * inv)
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.MAX_EDGE_CELLS:
+                long_edges.append(edge)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = edge_cells.get((cx, cy))
+                    if cell is None:
+                        edge_cells[(cx, cy)] = [edge]
+                    else:
+                        cell.append(edge)
+
+        self.node_cells = node_cells
+        self.edge_cells = edge_cells
+        self.long_edges = long_edges
+        self.max_radius = max_radius
+
+    def _cells_in(self, cells, x0, y0, x1, y1):
+        inv = 1.0 / self.cell_size
+        cx0, cx1 = math.floor(x0 * inv), math.floor(x1 * inv)
+        cy0, cy1 = math.floor(y0 * inv), math.floor(y1 * inv)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Zoomed far out: cheaper to walk the occupied cells
+            for (cx, cy), cell in cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield cell
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    yield cell
+
+    def visible_skills(self, x0, y0, x1, y1):
+        # Skills whose circle overlaps the rectangle, in list (drawing) order
+        m = self.max_radius
+        found = []
+        for cell in self._cells_in(self.node_cells, x0 - m, y0 - m, x1 + m, y1 + m):
+            for order, s in cell:
+                r = s.original_radius
+                sx, sy = s.x, s.y
+                if sx + r >= x0 and sx - r <= x1 and sy + r >= y0 and sy - r <= y1:
+                    found.append((order, s))
+        found.sort(key=lambda item: item[0])
+        return [s for _, s in found]
+
+    def pick(self, world_x, world_y):
+        # Topmost (last drawn) skill whose circle contains the point
+        m = self.max_radius
+        hit_order, hit = -1, None
+        for cell in self._cells_in(self.node_cells, world_x - m, world_y - m, world_x + m, world_y + m):
+            for order, s in cell:
+                if order > hit_order and s.contains_point(world_x, world_y):
+                    hit_order, hit = order, s
+        return hit
+
+    def visible_edges(self, x0, y0, x1, y1):
+        found = {}
+        candidates = list(self._cells_in(self.edge_cells, x0, y0, x1, y1))
+        candidates.append(self.long_edges)
+        for cell in candidates:
+            for edge in cell:
+                if edge in found:
+                    continue
+                a, b = edge
+                ax, ay, bx, by = a.x, a.y, b.x, b.y
+                if max(ax, bx) >= x0 and min(ax, bx) <= x1 and max(ay, by) >= y0 and min(ay, by) <= y1:
+                    found[edge] = None
+        return list(found)
+
+def visible_scene(scene_index, zoom, camera_offset):
+    half_w = WIDTH / 2 / zoom
+    half_h = HEIGHT / 2 / zoom
+    x0, x1 = camera_offset[0] - half_w, camera_offset[0] + half_w
+    y0, y1 = camera_offset[1] - half_h, camera_offset[1] + half_h
+    return scene_index.visible_skills(x0, y0, x1, y1), scene_index.visible_edges(x0, y0, x1, y1)
+
+def edge_look(a, b, cx, cy, zoom):
+    # What an edge looks like on screen: (colour, ax, ay, bx, by)
+    return (a.path.color if a.path and a.path == b.path else BLACK,
+            int((a.x - cx) * zoom + WIDTH / 2), int((a.y - cy) * zoom + HEIGHT / 2),
+            int((b.x - cx) * zoom + WIDTH / 2), int((b.y - cy) * zoom + HEIGHT / 2))
+
+def draw_edge_looks(surface, looks):
+    line = pygame.draw.line
+    for color, ax, ay, bx, by in looks:
+        line(surface, color, (ax, ay), (bx, by), 2)
+
+class EdgeLayer:
+    # The background and every visible edge, drawn once on an offscreen
+    # surface and blitted while nothing they show has changed. DirtyTracker
+    # already compares each edge's endpoints and colour every frame, so it
+    # decides when the layer is stale: a node moved, the camera moved, or an
+    # edge or path changed.
+    def __init__(self):
+        self.surface = None
+        self.stale = True
+        self.rebuilds = 0
+
+    def draw(self, screen, edges, tracked):
+        # tracked: DirtyTracker.items, holding each visible edge's look
+        if self.stale or self.surface is None:
+            if self.surface is None:
+                self.surface = pygame.Surface(screen.get_size(), 0, screen) # same pixel format, so blits are copies
+            self.surface.fill(DARK_GRAY)
+            draw_edge_looks(self.surface, (tracked[e][1] for e in edges))
+            self.stale = False
+            self.rebuilds += 1
+        screen.blit(self.surface, (0, 0))
+
+def draw_scene(screen, nodes, edges, zoom, camera_offset, pulsation_time,
+               active_skill=None, selected_path=None, connecting_skill=None, profiler=None,
+               edge_layer=None, tracked=None, selection=(), band=None):
+    # With an edge_layer the background and edges come from its cached
+    # surface; otherwise the edges are drawn over what is already there
+    lod = lod_for_zoom(zoom)
+    if edge_layer is not None:
+        edge_layer.draw(screen, edges, tracked)
+    else:
+        cx, cy = camera_offset
+        draw_edge_looks(screen, (edge_look(a, b, cx, cy, zoom) for a, b in edges))
+
+    if connecting_skill:
+        mouse_pos = pygame.mouse.get_pos()
+        temp_line_color = connecting_skill.path.color if connecting_skill.path else RED
+        skill_screen_x = (connecting_skill.x - camera_offset[0]) * zoom + WIDTH / 2
+        skill_screen_y = (connecting_skill.y - camera_offset[1]) * zoom + HEIGHT / 2
+        pygame.draw.line(screen, temp_line_color, (int(skill_screen_x), int(skill_screen_y)), mouse_pos, 2)
+    if profiler:
+        profiler.lap("edges")
+
+    selected_skills = selected_path.skills if selected_path else ()
+    for skill in nodes:
+        is_selected = skill == active_skill or skill in selected_skills or skill in selection
+        skill.draw(screen, pulsation_time, zoom, camera_offset, is_selected, lod)
+    if band:
+        pygame.draw.rect(screen, WHITE, band, 1)
+    if profiler:
+        profiler.lap("nodes")
+
+def scene_stats(skills, connections, nodes, edges, zoom):
+    return {
+        "lod": lod_for_zoom(zoom),
+        "nodes_drawn": len(nodes),
+        "nodes_culled": len(skills) - len(nodes),
+        "edges_drawn": len(edges),
+        "edges_culled": len(connections) - len(edges),
+    }
+
+class DirtyTracker:
+    # Remembers the screen rectangle and look of every visible node, edge and
+    # the link preview from the previous frame, and reports the rectangles
+    # that changed so only those need redrawing.
+    def __init__(self):
+        self.items = {}
+        self.full = True # next frame must redraw everything
+        self.edges_changed = True # some visible edge moved, recoloured, appeared or went
+
+    def update(self, nodes, edges, zoom, camera_offset, pulsation_time,
+               active_skill=None, selected_path=None, connecting_skill=None, selection=(), band=None):
+        lod = lod_for_zoom(zoom)
+        cx, cy = camera_offset
+        selected_skills = selected_path.skills if selected_path else ()
+        items = {}
+        for s in nodes:
+            fx = (s.x - cx) * zoom + WIDTH / 2
+            fy = (s.y - cy) * zoom + HEIGHT / 2
+            sx, sy = int(fx), int(fy)
+            radius = s.original_radius * zoom
+            if s == active_skill or s in selected_skills or s in selection:
+                radius += 5 * (1 + math.sin(pulsation_time * 0.008)) / 2 * zoom
+            half_w = half_h = int(radius) + (int(5 * zoom) + 2 if s.is_editing else 0)
+            if lod == LOD_FULL:
+                lines, widths, _ = text_layout.wrap(s.name, s.font, s.original_radius * 1.8)
+                half_w = max(half_w, max(widths) // 2 + 1)
+                half_h = max(half_h, len(lines) * s.font.get_linesize() // 2 + 1)
+            rect = pygame.Rect(sx - half_w - 2, sy - half_h - 2, 2 * half_w + 5, 2 * half_h + 5)
+            # Labels are centred on the unrounded position, so sub-pixel moves count too
+            look = (s.path.color if s.path else BLUE, s.name, s.is_editing, lod, round(fx), round(fy))
+            items[s] = (rect, look)
+
+        for edge in edges:
+            look = edge_look(edge[0], edge[1], cx, cy, zoom)
+            _, ax, ay, bx, by = look
+            rect = pygame.Rect(min(ax, bx) - 2, min(ay, by) - 2, abs(ax - bx) + 5, abs(ay - by) + 5)
+            items[edge] = (rect, look)
 
+        if connecting_skill:
+            ax = int((connecting_skill.x - cx) * zoom + WIDTH / 2)
+            ay = int((connecting_skill.y - cy) * zoom + HEIGHT / 2)
+            bx, by = pygame.mouse.get_pos()
+            rect = pygame.Rect(min(ax, bx) - 2, min(ay, by) - 2, abs(ax - bx) + 5, abs(ay - by) + 5)
+            items["link preview"] = (rect, connecting_skill.path.color if connecting_skill.path else RED)
+        if band:
+            items["rubber band"] = (band.inflate(2, 2), tuple(band))
+
+        prev = self.items
+        dirty = []
+        edges_changed = False
+        for key, (rect, look) in items.items():
+            old = prev.pop(key, None)
+            if old is None:
+                dirty.append(rect)
+            elif old[0] != rect or old[1] != look:
+                dirty.append(rect.union(old[0]))
+            else:
+                continue
+            edges_changed = edges_changed or type(key) is tuple
+        dirty.extend(rect for rect, _ in prev.values()) # gone since last frame
+        self.edges_changed = edges_changed or any(type(key) is tuple for key in prev)
+        self.items = items
+        return dirty
+
+# --- Tile cache: the settled world pre-rendered in squares, per zoom level ---
+ZOOM_STEP = 1.1            # the wheel zooms by whole steps, so every zoom is a cacheable level
+TILE_SIZE = 256            # px
+TILE_CACHE_BYTES = 64 * 1024 * 1024
+TILE_BUILD_BUDGET_MS = 6   # tile rendering per frame; the rest is left for the next frames
+TILE_FALLBACK_LEVELS = 8   # how many levels away a stand-in tile may come from
+
+class TileCache:
+    # Background, edges and nodes rendered in TILE_SIZE squares per zoom
+    # level, kept in an LRU capped at TILE_CACHE_BYTES. A frame blits the
+    # tiles under the camera; a missing tile is stood in for by scaled tiles
+    # of a nearby level while a few are rendered per frame, nearest the
+    # centre first, then the ring just outside the view. While the scene is
+    # static, track() drops every tile under a skill or edge that changed; a
+    # moving scene empties the cache once and is not looked at again until it
+    # settles, as tiles are only drawn while static.
+    def __init__(self, budget=TILE_CACHE_BYTES):
+        self.tiles = LRUCache(budget, cost=_surface_bytes)
+        self.levels = set() # levels that may hold tiles
+        self.pending = 0    # tiles the last draw still wanted
+        self._looks = {}    # skill -> look when last tracked
+        self._edges = set()
+        self._source = None
+
+    def clear(self):
+        self.tiles.clear()
+        self.levels.clear()
+        self._looks = {}
+        self._edges = set()
+        self._source = None
+
+    @staticmethod
+    def origin(level, camera_offset):
+        # Screen position of world (0, 0), snapped to whole pixels so tiles
+        # line up with each other and with whatever is drawn over them
+        zoom = ZOOM_STEP ** level
+        return round(WIDTH / 2 - camera_offset[0] * zoom), round(HEIGHT / 2 - camera_offset[1] * zoom)
+
+    @staticmethod
+    def snapped_camera(level, camera_offset):
+        zoom = ZOOM_STEP ** level
+        ox, oy = TileCache.origin(level, camera_offset)
+        return ((WIDTH / 2 - ox) / zoom, (HEIGHT / 2 - oy) / zoom)
+
+    # --- Invalidation ---
+    def track(self, skills, connections, static):
+        # With static set, positions are known not to have moved since the
+        # last call, so only a structural change needs a look
+        if not static:
+            if self._source is not None or self.levels:
+                self.clear() # rebuilt from scratch once the scene settles again
+            return
+        source = (skills, connections, connections.version)
+        if source == self._source:
+            return
+        if self._source is not None and skills is not self._source[0]:
+            self.clear() # a different tree was loaded
+        structural = source != self._source
+        self._source = source
+
+        prev = self._looks
+        looks = {}
+        changed = []
+        for s in skills:
+            look = (round(s.x * 4), round(s.y * 4), s.path.color if s.path else BLUE,
+                    s.name, s.original_radius, s.is_editing)
+            looks[s] = look
+            if prev.get(s) != look:
+                changed.append(s)
+        self._looks = looks
+        self.levels = {key[0] for key in self.tiles.keys()} # evicted levels need no dropping
+        if not self.levels:
+            self._edges = set(connections.edges) if structural else self._edges
+            return
+
+        for s in changed:
+            old = prev.get(s)
+            if old is not None:
+                self._drop_node(old)
+            self._drop_node(looks[s])
+            for t in connections.neighbors(s):
+                self._drop_edge(looks[s], looks.get(t))
+                if old is not None:
+                    self._drop_edge(old, prev.get(t))
+        if structural:
+            for s in prev.keys() - looks.keys(): # deleted
+                self._drop_node(prev[s])
+            edges = set(connections.edges)
+            for a, b in edges ^ self._edges: # linked or unlinked
+                self._drop_edge(looks.get(a) or prev.get(a), looks.get(b) or prev.get(b))
+                self._drop_edge(prev.get(a), prev.get(b))
+            self._edges = edges
+
+    def _drop_node(self, look):
+        x, y, r = look[0] / 4, look[1] / 4, look[4]
+        # Labels may spill past the circle by up to the wrap width; the editing glow by a few px
+        self._drop(x - r, y - r, x + r, y + r, 0.9 * r + 6)
+
+    def _drop_edge(self, a, b):
+        if a is not None and b is not None:
+            ax, ay, bx, by = a[0] / 4, a[1] / 4, b[0] / 4, b[1] / 4
+            self._drop(min(ax, bx), min(ay, by), max(ax, bx), max(ay, by), 2)
+
+    def _drop(self, x0, y0, x1, y1, pad_px):
+        # Every tile, at every level, overlapping the world rectangle grown by pad_px screen pixels
+        for level in self.levels:
+            zoom = ZOOM_STEP ** level
+            scale = zoom / TILE_SIZE
+            tx0, tx1 = math.floor(x0 * scale - pad_px / TILE_SIZE), math.floor(x1 * scale + pad_px / TILE_SIZE)
+            ty0, ty1 = math.floor(y0 * scale - pad_px / TILE_SIZE), math.floor(y1 * scale + pad_px / TILE_SIZE)
+            if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > len(self.tiles):
+                for key in self.tiles.keys():
+                    if key[0] == level and tx0 <= key[1] <= tx1 and ty0 <= key[2] <= ty1:
+                        self.tiles.pop(key)
+                continue
+            for tx in range(tx0, tx1 + 1):
+                for ty in range(ty0, ty1 + 1):
+                    self.tiles.pop((level, tx, ty))
+
+    # --- Drawing ---
+    def draw(self, screen, level, camera_offset, scene_index):
+        # Fills the screen from tiles. Returns the number of tiles rendered.
+        self.levels.add(level)
+        ox, oy = self.origin(level, camera_offset)
+        tx0, tx1 = -ox // TILE_SIZE, (WIDTH - 1 - ox) // TILE_SIZE
+        ty0, ty1 = -oy // TILE_SIZE, (HEIGHT - 1 - oy) // TILE_SIZE
+        missing = []
+        for tx in range(tx0, tx1 + 1):
+            for ty in range(ty0, ty1 + 1):
+                tile = self.tiles.get((level, tx, ty))
+                if tile is None:
+                    missing.append((tx, ty))
+                    self._stand_in(screen, level, tx, ty, ox, oy)
+                else:
+                    screen.blit(tile, (ox + tx * TILE_SIZE, oy + ty * TILE_SIZE))
+
+        cx, cy = (WIDTH / 2 - ox) / TILE_SIZE - 0.5, (HEIGHT / 2 - oy) / TILE_SIZE - 0.5
+        missing.sort(key=lambda t: (t[0] - cx) ** 2 + (t[1] - cy) ** 2)
+        if not missing: # view complete: render ahead into the surrounding ring
+            missing = [(tx, ty) for tx in range(tx0 - 1, tx1 + 2) for ty in range(ty0 - 1, ty1 + 2)
+                       if not (tx0 <= tx <= tx1 and ty0 <= ty <= ty1) and self.tiles.get((level, tx, ty)) is None]
+            visible = False
+        else:
+            visible = True
+        deadline = time.perf_counter() + TILE_BUILD_BUDGET_MS / 1000
+        built = 0
+        for tx, ty in missing:
+            if built and time.perf_counter() > deadline:
+                break
+            tile = self._build(screen, level, tx, ty, scene_index)
+            if visible:
+                screen.blit(tile, (ox + tx * TILE_SIZE, oy + ty * TILE_SIZE))
+            built += 1
+        self.pending = len(missing) - built
+        return built
+
+    def _build(self, screen, level, tx, ty, scene_index):
+        zoom = ZOOM_STEP ** level
+        x0, y0 = tx * TILE_SIZE / zoom, ty * TILE_SIZE / zoom
+        x1, y1 = x0 + TILE_SIZE / zoom, y0 + TILE_SIZE / zoom
+        pad = (0.9 * scene_index.max_radius + 6) / zoom # labels reaching in from outside
+        nodes = scene_index.visible_skills(x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+        edges = scene_index.visible_edges(x0 - 2 / zoom, y0 - 2 / zoom, x1 + 2 / zoom, y1 + 2 / zoom)
+        tile = pygame.Surface((TILE_SIZE, TILE_SIZE), 0, screen)
+        tile.fill(DARK_GRAY)
+        # A camera that puts the tile's corner at (0, 0)
+        draw_scene(tile, nodes, edges, zoom, (x0 + WIDTH / 2 / zoom, y0 + HEIGHT / 2 / zoom), 0.0)
+        self.tiles.put((level, tx, ty), tile)
+        return tile
+
+    def _stand_in(self, screen, level, tx, ty, ox, oy):
+        # The same world square from the nearest level that has all of it, scaled
+        rect = pygame.Rect(ox + tx * TILE_SIZE, oy + ty * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        screen.fill(DARK_GRAY, rect)
+        zoom = ZOOM_STEP ** level
+        for other in sorted(self.levels, key=lambda l: abs(l - level)):
+            if other == level or abs(other - level) > TILE_FALLBACK_LEVELS:
+                continue
+            scale = ZOOM_STEP ** other / zoom # other level's pixels per pixel of this one
+            ax0, ax1 = math.floor(tx * scale), math.ceil((tx + 1) * scale) - 1
+            ay0, ay1 = math.floor(ty * scale), math.ceil((ty + 1) * scale) - 1
+            if (ax1 - ax0 + 1) * (ay1 - ay0 + 1) > 9:
+                continue
+            parts = [(ax, ay, self.tiles.get((other, ax, ay))) for ax in range(ax0, ax1 + 1) for ay in range(ay0, ay1 + 1)]
+            if any(tile is None for _, _, tile in parts):
+                continue
+            clip = screen.get_clip()
+            screen.set_clip(rect.clip(clip))
+            size = math.ceil(TILE_SIZE / scale) + 1
+            for ax, ay, tile in parts:
+                screen.blit(pygame.transform.scale(tile, (size, size)),
+                            (ox + round(ax * TILE_SIZE / scale), oy + round(ay * TILE_SIZE / scale)))
+            screen.set_clip(clip)
+            return
+
+RENDER_STATS_RECT = (0, HEIGHT - 32, WIDTH, 32)
+
+def draw_render_stats(screen, stats):
+    text = (f"LOD {LOD_NAMES[stats['lod']]}   nodes {stats['nodes_drawn']} drawn / {stats['nodes_culled']} culled"
+            f"   edges {stats['edges_drawn']} drawn / {stats['edges_culled']} culled")
+    surf = get_font(20).render(text, True, WHITE)
+    screen.blit(surf, (10, HEIGHT - surf.get_height() - 8))
+
+
+# --- Frame profiler ---
+PROFILE_FRAMES = 300 # frames kept for the HUD and for trace dumps
+PROFILER_HUD_RECT = (0, HEIGHT - 250, 300, 214)
+
+class FrameProfiler:
+    # Splits each frame into consecutive phases: lap(name) closes the phase
+    # that ran since the previous lap. While disabled, lap() is one attribute
+    # check and nothing is recorded.
+    def __init__(self, frames=PROFILE_FRAMES):
+        self.enabled = False
+        self.frames = deque(maxlen=frames) # (start, [(phase, start, end)], counters)
+        self._laps = None
+        self._start = self._last = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._laps = None # a frame that is half recorded is dropped
+
+    def begin_frame(self):
+        if self.enabled:
+            self._start = self._last = time.perf_counter()
+            self._laps = []
+
+    def lap(self, phase):
+        if self._laps is not None:
+            t = time.perf_counter()
+            self._laps.append((phase, self._last, t))
+            self._last = t
+
+    def end_frame(self, **counters):
+        if self._laps is not None:
+            self.frames.append((self._start, self._laps, counters))
+            self._laps = None
+
+    def summary(self):
+        # phase -> (p50, p95, max) in ms over the kept frames; "frame" is the
+        # whole frame except the time spent waiting for events
+        per_phase = {}
+        for _, laps, _ in self.frames:
+            totals = {}
+            for phase, t0, t1 in laps:
+                totals[phase] = totals.get(phase, 0.0) + (t1 - t0)
+            totals["frame"] = sum(t1 - t0 for phase, t0, t1 in laps if phase != "wait")
+            for phase, dt in totals.items():
+                per_phase.setdefault(phase, []).append(dt * 1000)
+        stats = {}
+        for phase, values in per_phase.items():
+            values.sort()
+            n = len(values)
+            stats[phase] = (values[n // 2], values[min(n - 1, int(n * 0.95))], values[-1])
+        return stats
+
+    def dump_chrome_trace(self, filename):
+        # Trace Event Format: one complete ("X") event per phase, plus the
+        # frame's counters, loadable in chrome://tracing or Perfetto
+        if not self.frames:
+            return 0
+        origin = self.frames[0][0]
+        events = []
+        for start, laps, counters in self.frames:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": (start - origin) * 1e6, "dur": (laps[-1][2] - start) * 1e6 if laps else 0})
+            for phase, t0, t1 in laps:
+                events.append({"name": phase, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (t0 - origin) * 1e6, "dur": (t1 - t0) * 1e6})
+            if counters:
+                events.append({"name": "scene", "ph": "C", "pid": 1, "ts": (start - origin) * 1e6, "args": counters})
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(self.frames)
+
+def draw_profiler_hud(screen, profiler):
+    rect = pygame.Rect(PROFILER_HUD_RECT)
+    panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 180))
+    font = get_font(18)
+    stats = profiler.summary()
+    counters = profiler.frames[-1][2] if profiler.frames else {}
+    rows = [(f"{len(profiler.frames)} frames", "p50", "p95", "max ms")]
+    rows += [(phase, f"{p50:.2f}", f"{p95:.2f}", f"{worst:.2f}") for phase, (p50, p95, worst) in stats.items()]
+    columns = (8, 130, 185, 240) # the default font is proportional; align by hand
+    y = 6
+    for row in rows[:rect.height // font.get_linesize() - 1]:
+        for x, cell in zip(columns, row):
+            panel.blit(font.render(cell, True, WHITE), (x, y))
+        y += font.get_linesize()
+    counts = "  ".join(f"{k} {v}" for k, v in counters.items())
+    panel.blit(font.render(counts, True, WHITE), (8, rect.height - font.get_linesize() - 4))
+    screen.blit(panel, rect.topleft)
+
+
+# --- Layout multinivel ---
+def _coarsen(n, edge_a, edge_b, rng):
+    # One coarsening level. Edges are matched in random order (each node to
+    # its unmatched neighbour of lowest degree, so hubs do not swallow
+    # everything), matched pairs collapse into one node, and nodes left
+    # unmatched join a neighbour's group so stars collapse too.
+    # Returns (parent of each node, coarse node count, coarse edge arrays).
+    adjacency = [[] for _ in range(n)]
+    for a, b in zip(edge_a.tolist(), edge_b.tolist()):
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+    match = [-1] * n
+    order = list(range(n))
+    rng.shuffle(order)
+    for u in order:
+        if match[u] < 0:
+            best = -1
+            for v in adjacency[u]:
+                if match[v] < 0 and v != u and (best < 0 or len(adjacency[v]) < len(adjacency[best])):
+                    best = v
+            if best >= 0:
+                match[u] = best
+                match[best] = u
+
+    parent = [-1] * n
+    count = 0
+    for u in range(n):
+        if parent[u] < 0 and match[u] >= 0:
+            parent[u] = parent[match[u]] = count
+            count += 1
+    for u in range(n):
+        if parent[u] < 0:
+            if adjacency[u]: # every neighbour of an unmatched node is matched
+                parent[u] = parent[adjacency[u][0]]
+            else:
+                parent[u] = count
+                count += 1
+
+    parent = np.array(parent, dtype=np.intp)
+    pa, pb = parent[edge_a], parent[edge_b]
+    keep = pa != pb
+    lo, hi = np.minimum(pa[keep], pb[keep]), np.maximum(pa[keep], pb[keep])
+    pairs = np.unique(lo * count + hi)
+    return parent, count, pairs // count, pairs % count
+
+def _refine(x, y, edge_a, edge_b, steps, forces):
+    state = PhysicsState()
+    n = len(x)
+    state.x, state.y = x, y
+    state.vx, state.vy = np.zeros(n), np.zeros(n)
+    state.dragging = np.zeros(n, dtype=bool)
+    state.pinned = np.zeros(n, dtype=bool)
+    state.edge_a, state.edge_b = edge_a, edge_b
+    settled = 0
+    for _ in range(steps):
+        state.step(PHYSICS_DT, *forces)
+        settled = settled + 1 if is_settled(state.kinetic_energy(), n) else 0
+        if settled >= SETTLED_STEPS:
+            break
+    return state.x, state.y
+
+def multilevel_layout(skills, connections, seed=0, repulsion_strength=10000, repulsion_range_sq=100**2,
+                      attraction_strength=0.05, ideal_distance=100, steps_per_level=MULTILEVEL_STEPS):
+    # Lays out skills from scratch: coarsen until the graph is small, lay out
+    # the coarsest level, then walk back to the full graph. At each level the
+    # children start around their parent, spread out so the area grows with
+    # the node count, and are refined with the same forces main() uses. The
+    # result is centred where the skills were. Returns the number of levels.
+    # Without numpy this falls back to plain simulation of the full graph.
+    forces = (repulsion_strength, repulsion_range_sq, attraction_strength, ideal_distance)
+    if np is None:
+        simulate(skills, connections, steps_per_level * 10, PHYSICS_DT, *forces)
+        return 1
+    n = len(skills)
+    if not n:
+        return 0
+    rng = random.Random(seed)
+    jitter = np.random.default_rng(seed)
+    index = {s: i for i, s in enumerate(skills)}
+    edge_a = np.fromiter((index[a] for a, _ in connections), np.intp, len(connections))
+    edge_b = np.fromiter((index[b] for _, b in connections), np.intp, len(connections))
+    cx = sum(s.x for s in skills) / n
+    cy = sum(s.y for s in skills) / n
+
+    levels = [(n, edge_a, edge_b)] # finest first
+    parents = []
+    while n > MULTILEVEL_MIN_NODES:
+        parent, count, edge_a, edge_b = _coarsen(n, edge_a, edge_b, rng)
+        if count > n * 0.95: # nothing left to collapse, e.g. unlinked skills
+            break
+        parents.append(parent)
+        levels.append((count, edge_a, edge_b))
+        n = count
+
+    n, edge_a, edge_b = levels[-1]
+    half = math.sqrt(n) * ideal_distance / 2
+    x = cx + jitter.uniform(-half, half, n)
+    y = cy + jitter.uniform(-half, half, n)
+    x, y = _refine(x, y, edge_a, edge_b, steps_per_level * 4, forces)
+    for parent, (n, edge_a, edge_b) in zip(reversed(parents), reversed(levels[:-1])):
+        scale = math.sqrt(n / len(x))
+        mx, my = x.mean(), y.mean()
+        # Children scatter over a disc that grows with the size of their group
+        spread = np.sqrt(np.bincount(parent)[parent]) * ideal_distance / 2
+        angle = jitter.uniform(0, 2 * math.pi, n)
+        r = spread * np.sqrt(jitter.uniform(0, 1, n))
+        x = mx + (x[parent] - mx) * scale + r * np.cos(angle)
+        y = my + (y[parent] - my) * scale + r * np.sin(angle)
+        x, y = _refine(x, y, edge_a, edge_b, steps_per_level, forces)
+
+    x += cx - x.mean()
+    y += cy - y.mean()
+    for s, sx, sy in zip(skills, x.tolist(), y.tolist()):
+        s.x = sx
+        s.y = sy
+        s.vx = s.vy = 0.0
+        s.pinned = False
+    return len(levels)
+
+
+# --- Layout jerárquico por Path ---
+TREE_SIBLING_GAP = 20 # px between neighbouring subtrees
+TREE_LAYER_GAP = 60   # px between layers
+TREE_PACK_GAP = 80    # px between packed paths
+
+def _tree_layout_path(members, connections):
+    # Layered tidy tree of one connected Path. Roots are the skills no edge
+    # points to (from->to); a path that is all cycles starts at its first
+    # skill. A breadth-first walk from all roots at once gives each skill its
+    # layer and a tree parent, ignoring direction so reversed links still
+    # hang off the tree. Every subtree gets a slot as wide as its children
+    # (or itself) and the parent is centred over it. Linear in the path size.
+    # Returns ({skill: (x, y)} relative to the top-left corner, width, height).
+    roots = [s for s in members if not any((t, s) in connections.edges for t in connections.neighbors(s))]
+    roots = roots or members[:1]
+    depth = dict.fromkeys(roots, 0)
+    children = {s: [] for s in members}
+    order = list(roots)
+    for s in order: # grows while walking
+        for t in connections.neighbors(s):
+            if t not in depth:
+                depth[t] = depth[s] + 1
+                children[s].append(t)
+                order.append(t)
+
+    width = {}
+    for s in reversed(order):
+        width[s] = max(2 * s.original_radius + TREE_SIBLING_GAP, sum(width[c] for c in children[s]))
+    layer_height = [0] * (max(depth.values()) + 1)
+    for s in order:
+        layer_height[depth[s]] = max(layer_height[depth[s]], 2 * s.original_radius)
+    layer_y = []
+    top = 0
+    for h in layer_height:
+        layer_y.append(top + h / 2)
+        top += h + TREE_LAYER_GAP
+
+    left = {}
+    cursor = 0
+    for r in roots:
+        left[r] = cursor
+        cursor += width[r]
+    positions = {}
+    for s in order: # parents come before their children
+        positions[s] = (left[s] + width[s] / 2, layer_y[depth[s]])
+        kids = children[s]
+        x = left[s] + (width[s] - sum(width[c] for c in kids)) / 2
+        for c in kids:
+            left[c] = x
+            x += width[c]
+    return positions, cursor, top - TREE_LAYER_GAP
+
+def tree_layout(paths, connections, pin=True):
+    # Lays out every path as a tidy tree and packs the trees in shelves
+    # (tallest first, rows about as wide as the total is tall), centred where
+    # the skills were. Laid-out skills stop and, with pin, stay put: the
+    # physics loop skips them until they are unpinned. Returns how many
+    # skills were placed.
+    boxes = [_tree_layout_path(list(p.skills), connections) for p in paths if p.skills]
+    if not boxes:
+        return 0
+    boxes.sort(key=lambda box: -box[2])
+    area = sum((w + TREE_PACK_GAP) * (h + TREE_PACK_GAP) for _, w, h in boxes)
+    row_width = max(math.sqrt(area), max(w for _, w, _ in boxes))
+    placed = []
+    x = y = row_height = 0
+    for positions, w, h in boxes:
+        if x and x + w > row_width:
+            x, y = 0, y + row_height + TREE_PACK_GAP
+            row_height = 0
+        placed.append((positions, x, y))
+        x += w + TREE_PACK_GAP
+        row_height = max(row_height, h)
+
+    skills = [s for positions, _, _ in placed for s in positions]
+    cx = sum(s.x for s in skills) / len(skills)
+    cy = sum(s.y for s in skills) / len(skills)
+    ox = cx - (row_width if y else x - TREE_PACK_GAP) / 2
+    oy = cy - (y + row_height) / 2
+    for positions, bx, by in placed:
+        for s, (sx, sy) in positions.items():
+            s.x = ox + bx + sx
+            s.y = oy + by + sy
+            s.vx = s.vy = 0.0
+            s.pinned = pin
+    return len(skills)
+
+def unpin_all(skills):
+    for s in skills:
+        s.pinned = False
+
+
+# --- Modo por lotes (sin ventana) ---
+def simulate(skills, connections, steps, dt, repulsion_strength=10000, repulsion_range_sq=100**2,
+             attraction_strength=0.05, ideal_distance=100):
+    # Runs the same forces as main() for up to steps steps; stops early once
+    # the layout has been settled for SETTLED_STEPS steps.
+    # Returns (steps run, converged).
+    state = PhysicsState() if np is not None else None
+    grid = SpatialHash(math.sqrt(repulsion_range_sq))
+    settled = 0
+    step = 0
+    while step < steps and settled < SETTLED_STEPS:
+        step += 1
+        if state is not None:
+            state.sync(skills, connections)
+            state.step(dt, repulsion_strength, repulsion_range_sq, attraction_strength, ideal_distance)
+            energy = state.kinetic_energy()
+        else:
+            grid.rebuild(skills)
+            apply_repulsion_grid(grid, repulsion_strength, repulsion_range_sq)
+            apply_attraction(connections, attraction_strength, ideal_distance)
+            for skill in skills:
+                skill.update(dt)
+            energy = kinetic_energy(skills)
+        settled = settled + 1 if is_settled(energy, len(skills)) else 0
+    if state is not None:
+        state.release()
+    return step, settled >= SETTLED_STEPS
+
+def layout_file(filename, out_filename, seed, steps, dt, multilevel=False, **forces):
+    # Seeded per file, so results do not depend on how files are spread over workers
+    random.seed(seed)
+    skills, paths, connections = load_tree(filename, progress=None)
+    if multilevel:
+        multilevel_layout(skills, connections, seed, **forces)
+    run, converged = simulate(skills, connections, steps, dt, **forces)
+    tmp = out_filename + ".tmp" + os.path.splitext(out_filename)[1]
+    save_tree(tmp, skills, paths, connections)
+    os.replace(tmp, out_filename)
+    return len(skills), run, converged
+
+def _layout_job(job):
+    filename, out_filename, seed, steps, dt, multilevel, forces = job
+    # A damaged file (a cut-off .csv.gz raises EOFError or zlib.error, ...) is
+    # reported and skipped; the rest of the batch still gets written
+    try:
+        return filename, layout_file(filename, out_filename, seed, steps, dt, multilevel, **forces), None
+    except Exception as e:
+        return filename, None, e
+
+def cli(argv=None):
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+
+    ap = argparse.ArgumentParser(prog="skill_tree.py layout",
+                                 description="Lay out skill tree files without opening a window.")
+    ap.add_argument("files", nargs="+", help="CSV, .csv.gz or .stb files to lay out")
+    out = ap.add_mutually_exclusive_group(required=True)
+    out.add_argument("-o", "--out-dir", help="write results here, keeping file names")
+    out.add_argument("--in-place", action="store_true", help="overwrite the input files")
+    ap.add_argument("--steps", type=int, default=2000, help="maximum physics steps")
+    ap.add_argument("--dt", type=float, default=1/60, help="seconds per step")
+    ap.add_argument("--repulsion", type=float, default=10000)
+    ap.add_argument("--repulsion-range", type=float, default=100)
+    ap.add_argument("--attraction", type=float, default=0.05)
+    ap.add_argument("--ideal-distance", type=float, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--multilevel", action="store_true",
+                    help="start from a multilevel layout instead of the saved positions")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="files laid out in parallel")
+    args = ap.parse_args(argv)
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    forces = dict(repulsion_strength=args.repulsion, repulsion_range_sq=args.repulsion_range**2,
+                  attraction_strength=args.attraction, ideal_distance=args.ideal_distance)
+    jobs = [(f, f if args.in_place else os.path.join(args.out_dir, os.path.basename(f)),
+             args.seed, args.steps, args.dt, args.multilevel, forces) for f in args.files]
+
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_layout_job, jobs))
+    else:
+        results = [_layout_job(job) for job in jobs]
+
+    failed = 0
+    for (filename, result, error), job in zip(results, jobs):
+        if error:
+            failed += 1
+            print(f"[ERROR] {filename}: {error}")
+            continue
+        count, run, converged = result
+        state = f"converged after {run} steps" if converged else f"stopped at {run} steps"
+        print(f"[OK] {filename} -> {job[1]}: {count} skills, {state}")
+    return 1 if failed else 0
 
 def main():
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Skill Tree Builder")
+
     skills = []
     paths = [] # List to store Path objects
-    connections = [] # List to store connections (skill1, skill2)
+    connections = SkillGraph() # Connections (skill1 -> skill2) with adjacency sets
     active_skill = None
     connecting_skill = None # Skill currently being connected from
+    dragged_skill = None
     selected_path = None
+    selection = {} # skills picked with the rubber band, an insertion-ordered set
+    band_start = None # screen position the rubber band is dragged from
+    band = None
+    group_origin = None # where the dragged skill started when it drags the whole selection
     clock = pygame.time.Clock()
     global_pulsation_time = 0.0
 
     
 
     global instructions_open
-
+    instructions_dropdown = InstructionsDropdown()
+    side_panel = SidePanel()
+    scene_index = SceneIndex()
+    edge_layer = EdgeLayer()
+    tile_cache = TileCache()
+    use_tiles = True # F5
+    was_quiet = False
+    tiled = False
+    relaid = False # positions changed outside physics and dragging (T, L)
+    show_render_stats = False # F3
+    profiler = FrameProfiler() # F2 shows the HUD, F4 dumps a trace
+    dirty_tracker = DirtyTracker()
+    last_view = None
+    last_overlays = None
+    was_pulsing = False # the tiles then still have pulse circles or a band drawn over them
+    idle = False
+
+    # Autosave: recover the last session, then journal every change
+    journal = Journal()
+    skills, paths, connections = journal.recover()
+    if skills:
+        print(f"[OK] Recovered {len(skills)} skills from {journal.directory}")
+    tree_io = TreeIO(journal) # Ctrl+S / Ctrl+O
 
     # Camera and zoom
+    zoom_level = 0 # zoom = ZOOM_STEP ** zoom_level
     zoom = 1.0
-    min_zoom = 0.2
-    max_zoom = 3.0
+    min_zoom_level = -16 # 0.22
+    max_zoom_level = 11  # 2.85
     camera_offset = [WIDTH / 2, HEIGHT / 2]
     panning = False
     pan_start_pos = [0, 0]
@@ -559,83 +3252,116 @@ def main():
     attraction_strength = 0.05
     ideal_distance = 100
     repulsion_range_sq = 100**2 # Repel only nodes within 100 pixels
+    use_spatial_hash = True # G toggles back to the brute-force pair loop
+    spatial_hash = SpatialHash(math.sqrt(repulsion_range_sq))
+    use_barnes_hut = False # B: long-range repulsion, no cutoff
+    barnes_hut_theta = 0.7 # [ / ] trade accuracy for speed
+    physics_state = PhysicsState() if np is not None else None
+    use_numpy_physics = physics_state is not None # N falls back to per-Skill Python physics
+    physics_worker = PhysicsWorker() if physics_state is not None else None # W steps on this thread instead
+    use_island_sleep = True # Z: settled paths stop taking part in physics
+    island_sleep = IslandSleep() # for the per-Skill physics; PhysicsState keeps its own
 
     running = True
     while running:
-        dt = clock.tick(60) / 1000.0  # Delta time in seconds
+        profiler.begin_frame()
+        if idle:
+            # Settled and untouched: sleep until something happens
+            first = pygame.event.wait(IDLE_WAIT_MS)
+            events = [first] + pygame.event.get() if first.type != pygame.NOEVENT else []
+            clock.tick()
+            dt = 0.0
+        else:
+            dt = min(clock.tick(60) / 1000.0, MAX_FRAME_DT)  # Delta time in seconds
+            events = pygame.event.get()
         global_pulsation_time += dt * 1000
-
-        for s in skills:
-            sx = (s.x - camera_offset[0]) * zoom + WIDTH / 2
-            sy = (s.y - camera_offset[1]) * zoom + HEIGHT / 2
-            sr = s.original_radius * zoom
-            s.rect = pygame.Rect(sx - sr, sy - sr, sr * 2, sr * 2)
-
-        for event in pygame.event.get():
+        profiler.lap("wait")
+
+        done = tree_io.poll()
+        if done and done[0] == 'saved':
+            print(f"[OK] Saved to {done[1]}")
+        elif done and done[0] == 'loaded':
+            # The new tree replaces the old one in a single frame
+            fname, (skills, paths, connections), unmeasured, snapshot = done[1:]
+            for s in unmeasured:
+                s._update_radius()
+            journal.compact(skills, paths, connections, snapshot)
+            active_skill = connecting_skill = selected_path = dragged_skill = None
+            group_origin = band_start = band = None
+            selection.clear()
+            print(f"[OK] Loaded {len(skills)} skills, {len(connections)} edges from {fname}")
+        elif done:
+            print(f"[ERROR] Could not {done[1]} the file: {done[2]}")
+        # Skill and Path ids are being handed out on the loader's thread
+        opening = tree_io.kind == 'open'
+
+        for event in coalesce_motion(events):
             if event.type == pygame.QUIT:
                 running = False
 
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                dirty_tracker.full = True
+
             
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 4: # Zoom in
-                    zoom = min(max_zoom, zoom * 1.1)
+                if event.button in (4, 5) and selected_path and side_panel.contains(event.pos):
+                    side_panel.scroll_by(selected_path, -3 if event.button == 4 else 3)
+                elif event.button == 4: # Zoom in
+                    zoom_level = min(max_zoom_level, zoom_level + 1)
+                    zoom = ZOOM_STEP ** zoom_level
                 elif event.button == 5: # Zoom out
-                    zoom = max(min_zoom, zoom * 0.9)
+                    zoom_level = max(min_zoom_level, zoom_level - 1)
+                    zoom = ZOOM_STEP ** zoom_level
                 elif event.button == 2: # Middle mouse button for panning
                     panning = True
                     pan_start_pos = pygame.mouse.get_pos()
 
                 if event.button == 1:  # Left-click
-                    clicked_on_skill = False
-
-                    for s in skills:
-                        sx = (s.x - camera_offset[0]) * zoom + WIDTH / 2
-                        sy = (s.y - camera_offset[1]) * zoom + HEIGHT / 2
-                        sr = s.original_radius * zoom
-                        s.rect = pygame.Rect(sx - sr, sy - sr, sr * 2, sr * 2)
-
-                    for skill in skills:
-                        if skill.rect.collidepoint(event.pos):
-                            clicked_on_skill = True
-                            selected_path = skill.path
-                            keys = pygame.key.get_pressed()
-                            if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]:
-                                if connecting_skill is None:
-                                    connecting_skill = skill
-                                else:
-                                    if connecting_skill != skill:
-                                        if not any(c in [(connecting_skill, skill), (skill, connecting_skill)] for c in connections):
-                                            connections.append((connecting_skill, skill))
-                                        if connecting_skill.path and skill.path:
-                                            if connecting_skill.path != skill.path:
-                                                connecting_skill.path.merge_path(skill.path)
-                                                if skill.path in paths:
-                                                    paths.remove(skill.path)
-                                        elif connecting_skill.path:
-                                            connecting_skill.path.add_skill(skill)
-                                        elif skill.path:
-                                            skill.path.add_skill(connecting_skill)
-                                        else:
-                                            new_path = Path()
-                                            new_path.add_skill(connecting_skill)
-                                            new_path.add_skill(skill)
-                                            paths.append(new_path)
-                                        connecting_skill = None
+                    mouse_x, mouse_y = event.pos
+                    world_x = (mouse_x - WIDTH / 2) / zoom + camera_offset[0]
+                    world_y = (mouse_y - HEIGHT / 2) / zoom + camera_offset[1]
+                    if not scene_index.is_current(skills, connections):
+                        scene_index.rebuild(skills, connections)
+                    skill = scene_index.pick(world_x, world_y)
+
+                    if skill:
+                        selected_path = skill.path
+                        keys = pygame.key.get_pressed()
+                        if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]:
+                            if connecting_skill is None:
+                                connecting_skill = skill
                             else:
-                                if active_skill:
-                                    active_skill.is_editing = False
-                                active_skill = skill
-                            break
-                    
-                    if not clicked_on_skill:
+                                if connecting_skill != skill and not opening:
+                                    link_skills(connecting_skill, skill, connections, paths)
+                                    journal.record('link', connecting_skill.id, skill.id, paths=paths)
+                                    connecting_skill = None
+                        else:
+                            if active_skill:
+                                active_skill.is_editing = False
+                            active_skill = skill
+                        skill.handle_event(event, zoom, camera_offset)
+                        dragged_skill = skill
+                        if skill in selection:
+                            group_origin = (skill.x, skill.y)
+                            for s in selection:
+                                s.is_dragging = True
+                                s.vx = s.vy = 0
+                        elif not (keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]):
+                            selection.clear()
+                    else:
                         if active_skill:
                             active_skill.is_editing = False
                             active_skill = None
                         selected_path = None
                         connecting_skill = None
+                        keys = pygame.key.get_pressed()
+                        if not (keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]):
+                            selection.clear()
+                        band_start = event.pos
+                        band = pygame.Rect(event.pos, (0, 0))
 
-                elif event.button == 3:
+                elif event.button == 3 and not opening:
                     if active_skill:
                         active_skill.is_editing = False
                     mouse_x, mouse_y = event.pos
@@ -643,9 +3369,11 @@ def main():
                     world_y = (mouse_y - HEIGHT / 2) / zoom + camera_offset[1]
                     new_skill = Skill(world_x, world_y)
                     skills.append(new_skill)
+                    connections.add_skill(new_skill)
                     new_path = Path()
                     new_path.add_skill(new_skill)
                     paths.append(new_path)
+                    journal.record('create', new_skill.id, f'{world_x:.3f}', f'{world_y:.3f}', paths=paths)
                     active_skill = new_skill
                     active_skill.is_editing = True
                     connecting_skill = None
@@ -653,8 +3381,24 @@ def main():
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 2:
                     panning = False
+                elif event.button == 1 and band_start:
+                    if band.width > 4 or band.height > 4: # a plain click only deselects
+                        x0 = (band.left - WIDTH / 2) / zoom + camera_offset[0]
+                        y0 = (band.top - HEIGHT / 2) / zoom + camera_offset[1]
+                        x1 = (band.right - WIDTH / 2) / zoom + camera_offset[0]
+                        y1 = (band.bottom - HEIGHT / 2) / zoom + camera_offset[1]
+                        if not scene_index.is_current(skills, connections):
+                            scene_index.rebuild(skills, connections)
+                        for s in scene_index.visible_skills(x0, y0, x1, y1):
+                            if x0 <= s.x <= x1 and y0 <= s.y <= y1:
+                                selection[s] = None
+                        print(f"[OK] {len(selection)} skills selected")
+                    band_start = band = None
 
             elif event.type == pygame.MOUSEMOTION:
+                if band_start:
+                    band = pygame.Rect(min(band_start[0], event.pos[0]), min(band_start[1], event.pos[1]),
+                                       abs(event.pos[0] - band_start[0]), abs(event.pos[1] - band_start[1]))
                 if panning:
                     pan_end_pos = pygame.mouse.get_pos()
                     dx = pan_end_pos[0] - pan_start_pos[0]
@@ -672,167 +3416,306 @@ def main():
                 if event.key == pygame.K_h:
                     instructions_open = not instructions_open
 
-                # Ctrl+S -> choose where to save
-                if (mods & pygame.KMOD_CTRL) and event.key == pygame.K_s:
-                    fname = ask_save_csv("skill_tree_export.csv")
-                    if fname:
-                        export_to_csv(fname, skills, paths, connections)
-                        print(f"[OK] Saved to {fname}")
-
-                # Ctrl+O -> choose a CSV to open
+                editing = active_skill is not None and active_skill.is_editing
+                if event.key == pygame.K_g and not editing:
+                    use_spatial_hash = not use_spatial_hash
+                    print(f"[OK] Spatial hash repulsion {'on' if use_spatial_hash else 'off'}")
+                elif event.key == pygame.K_b and not editing:
+                    use_barnes_hut = not use_barnes_hut
+                    print(f"[OK] Barnes-Hut repulsion {'on' if use_barnes_hut else 'off'} (theta={barnes_hut_theta:.1f})")
+                elif event.key == pygame.K_F3:
+                    show_render_stats = not show_render_stats
+                elif event.key == pygame.K_F5:
+                    use_tiles = not use_tiles
+                    tile_cache.clear()
+                    print(f"[OK] Tile cache {'on' if use_tiles else 'off'}")
+                elif event.key == pygame.K_F2:
+                    profiler.toggle()
+                elif event.key == pygame.K_F4:
+                    fname = time.strftime("skill_tree_trace_%Y%m%d_%H%M%S.json")
+                    frames = profiler.dump_chrome_trace(fname)
+                    if frames:
+                        print(f"[OK] Wrote {frames} frames to {fname}")
+                    else:
+                        print("[..] No frames recorded yet; turn the profiler on with F2")
+                elif event.key == pygame.K_n and not editing and physics_state is not None:
+                    use_numpy_physics = not use_numpy_physics
+                    if not use_numpy_physics:
+                        physics_state.release()
+                    island_sleep.clear()
+                    print(f"[OK] NumPy physics {'on' if use_numpy_physics else 'off'}")
+                elif event.key == pygame.K_l and not editing and skills:
+                    t0 = time.perf_counter()
+                    levels = multilevel_layout(skills, connections, random.randrange(1 << 30), repulsion_strength,
+                                               repulsion_range_sq, attraction_strength, ideal_distance)
+                    if physics_state is not None:
+                        physics_state.release() # re-sync, and reload the worker with the new positions
+                    relaid = True
+                    print(f"[OK] Multilevel layout of {len(skills)} skills ({levels} levels) in {time.perf_counter() - t0:.1f} s")
+                elif event.key == pygame.K_t and not editing and skills:
+                    t0 = time.perf_counter()
+                    placed = tree_layout(paths, connections)
+                    if physics_state is not None:
+                        physics_state.release() # pins only reach the worker on a reload
+                    relaid = True
+                    print(f"[OK] Tree layout of {placed} skills in {len(paths)} paths in {(time.perf_counter() - t0) * 1000:.0f} ms (pinned; U to unpin)")
+                elif event.key == pygame.K_u and not editing and skills:
+                    unpin_all(skills)
+                    if physics_state is not None:
+                        physics_state.release()
+                    print("[OK] All skills unpinned")
+                elif event.key == pygame.K_z and not editing:
+                    use_island_sleep = not use_island_sleep
+                    island_sleep.clear()
+                    if physics_state is not None:
+                        physics_state.wake_all()
+                    print(f"[OK] Island sleeping {'on' if use_island_sleep else 'off'}")
+                elif event.key == pygame.K_w and not editing and physics_state is not None:
+                    if physics_worker:
+                        physics_worker.stop()
+                        physics_worker = None
+                    else:
+                        physics_worker = PhysicsWorker()
+                    print(f"[OK] Physics worker thread {'on' if physics_worker else 'off'}")
+                elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET) and not editing:
+                    step = 0.1 if event.key == pygame.K_RIGHTBRACKET else -0.1
+                    barnes_hut_theta = min(2.0, max(0.0, round(barnes_hut_theta + step, 1)))
+                    print(f"[OK] Barnes-Hut theta = {barnes_hut_theta:.1f}")
+
+                # Ctrl+S -> choose where to save; the file is written in the background
+                if (mods & pygame.KMOD_CTRL) and event.key in (pygame.K_s, pygame.K_o) and tree_io.busy:
+                    print("[..] Still busy with the last save or open")
+                elif (mods & pygame.KMOD_CTRL) and event.key == pygame.K_s:
+                    tree_io.save(skills, paths, connections, "skill_tree_export.csv")
+
+                # Ctrl+O -> choose a CSV, .csv.gz or .stb file to open; it is swapped in once loaded
                 elif (mods & pygame.KMOD_CTRL) and event.key == pygame.K_o:
-                    fname = ask_open_csv()
-                    if fname:
-                        skills, paths, connections = import_from_csv(fname)
-                        # (optional) reset transient selections if your app needs it
-                        active_skill = None
-                        connecting_skill = None
-                        selected_path = None
-                        print(f"[OK] Loaded from {fname}")
-
-                                    
+                    tree_io.open()
 
                 #Edition mode
                 if event.key == pygame.K_RETURN and active_skill:
                     active_skill.is_editing = not active_skill.is_editing
+                elif event.key in (pygame.K_DELETE, pygame.K_d) and opening:
+                    pass # ids are renumbered under the loader; nothing may create paths
+                elif event.key == pygame.K_DELETE and group_origin:
+                    pass # the selection is held by the drag until it is dropped
+                elif event.key == pygame.K_DELETE and selection and dragged_skill is None:
+                    t0 = time.perf_counter()
+                    delete_skills(selection, skills, connections, paths)
+                    journal.record('delete_many', journal_ids(selection), paths=paths)
+                    print(f"[OK] Deleted {len(selection)} skills in {(time.perf_counter() - t0) * 1000:.0f} ms")
+                    if active_skill in selection:
+                        active_skill = None
+                    if connecting_skill in selection:
+                        connecting_skill = None
+                    if selected_path not in paths:
+                        selected_path = None
+                    selection.clear()
                 elif event.key == pygame.K_DELETE and active_skill:
-                    skill_to_delete = active_skill
-                    skills.remove(skill_to_delete)
-                    connections = [c for c in connections if skill_to_delete not in c]
-                    
-                    if skill_to_delete.path:
-                        original_path = skill_to_delete.path
-                        original_path.remove_skill(skill_to_delete)
-                        if original_path.skills:
-                            recalculate_paths_for_path(original_path, connections, paths)
-                        elif original_path in paths:
-                            paths.remove(original_path)
-                    
+                    delete_skill(active_skill, skills, connections, paths)
+                    journal.record('delete', active_skill.id, paths=paths)
+                    if dragged_skill is active_skill:
+                        dragged_skill = None
+                    selection.pop(active_skill, None)
                     active_skill = None
-                    
-                elif event.key == pygame.K_d and active_skill and not active_skill.is_editing:
-                    skill_to_disconnect = active_skill
-                    had_conn = any(skill_to_disconnect in c for c in connections)
-                    connections = [c for c in connections if skill_to_disconnect not in c]
-
-                    if skill_to_disconnect.path:
-                        original_path = skill_to_disconnect.path
-                        original_path.remove_skill(skill_to_disconnect)
 
-                        if had_conn:
-                            new_path = Path()
-                            new_path.add_skill(skill_to_disconnect)
-                            paths.append(new_path)
-
-                        if original_path.skills:
-                            recalculate_paths_for_path(original_path, connections, paths)
-                        elif original_path in paths:
-                            paths.remove(original_path)
-
-            if active_skill:
+                elif event.key == pygame.K_d and selection and not (active_skill and active_skill.is_editing):
+                    detach_skills(selection, connections, paths)
+                    journal.record('detach_many', journal_ids(selection), paths=paths)
+                    if selected_path not in paths:
+                        selected_path = None
+                elif event.key == pygame.K_ESCAPE and selection:
+                    selection.clear()
+                elif event.key == pygame.K_d and active_skill and not active_skill.is_editing:
+                    detach_skill(active_skill, connections, paths)
+                    journal.record('detach', active_skill.id, paths=paths)
+
+            # Only the dragged skill and the one being edited care about events
+            if dragged_skill and event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONUP):
+                px, py = dragged_skill.x, dragged_skill.y
+                dragged_skill.handle_event(event, zoom, camera_offset)
+                if group_origin:
+                    # The rest of the selection follows the skill under the mouse
+                    dx, dy = dragged_skill.x - px, dragged_skill.y - py
+                    if dx or dy:
+                        move_skills((s for s in selection if s is not dragged_skill), dx, dy)
+                if not dragged_skill.is_dragging and group_origin:
+                    for s in selection:
+                        s.is_dragging = False
+                    journal.record('move_many', journal_ids(selection), f'{dragged_skill.x - group_origin[0]:.3f}',
+                                   f'{dragged_skill.y - group_origin[1]:.3f}')
+                    dragged_skill = group_origin = None
+                elif not dragged_skill.is_dragging:
+                    journal.record('move', dragged_skill.id, f'{dragged_skill.x:.3f}', f'{dragged_skill.y:.3f}')
+                    dragged_skill = None
+            elif active_skill and active_skill.is_editing and event.type == pygame.KEYDOWN:
                 active_skill.handle_event(event, zoom, camera_offset)
-            
-            for skill in skills:
-                if skill != active_skill:
-                    skill.handle_event(event, zoom, camera_offset)
+                journal.renamed(active_skill)
+                if use_numpy_physics:
+                    physics_state.wake(active_skill) # the per-Skill physics sees the Path.version bump
+
+        # Names are journaled once editing ends, not per keystroke
+        if not (active_skill and active_skill.is_editing):
+            journal.flush_renames()
+        if journal.needs_compaction:
+            journal.compact(skills, paths, connections)
+        profiler.lap("events")
 
         # Physics calculations
-        for i, s1 in enumerate(skills):
-            for s2 in skills[i+1:]:
-                dx = s2.x - s1.x
-                dy = s2.y - s1.y
-                distance_sq = dx*dx + dy*dy
-                if distance_sq == 0 or distance_sq > repulsion_range_sq:
-                    continue
+        if use_numpy_physics and physics_worker:
+            # Fixed-step physics runs on the worker; this only feeds it and
+            # picks up its latest positions
+            physics_worker.update(physics_state, skills, connections,
+                                  (repulsion_strength, repulsion_range_sq, attraction_strength, ideal_distance,
+                                   barnes_hut_theta if use_barnes_hut else None))
+            if use_island_sleep:
+                physics_state.settle(repulsion_range_sq)
+            profiler.lap("physics")
+        elif use_numpy_physics:
+            physics_state.sync(skills, connections)
+            physics_state.step(dt, repulsion_strength, repulsion_range_sq, attraction_strength, ideal_distance,
+                               barnes_hut_theta if use_barnes_hut else None)
+            if use_island_sleep:
+                physics_state.settle(repulsion_range_sq)
+            profiler.lap("physics")
+        else:
+            # Sleeping skills within range still push on awake ones (all of
+            # them do with Barnes-Hut), but are not moved
+            awake, sleeping = island_sleep.split(skills, repulsion_range_sq) if use_island_sleep else (skills, ())
+            halo = island_sleep.near(awake, repulsion_range_sq) if sleeping and not use_barnes_hut else []
+            if use_barnes_hut:
+                apply_repulsion_barnes_hut(awake, repulsion_strength, barnes_hut_theta, sleeping)
+            elif use_spatial_hash:
+                spatial_hash.rebuild(awake + halo if halo else awake)
+                apply_repulsion_grid(spatial_hash, repulsion_strength, repulsion_range_sq)
+            else:
+                apply_repulsion_brute(awake + halo if halo else awake, repulsion_strength, repulsion_range_sq)
+            for skill in halo:
+                skill.vx = skill.vy = 0
+            profiler.lap("repulsion")
+
+            # Attraction for connected skills
+            apply_attraction(awake_edges(connections, awake) if sleeping else connections,
+                             attraction_strength, ideal_distance)
+            profiler.lap("attraction")
+
+            for skill in awake:
+                skill.update(dt)
+            if use_island_sleep:
+                island_sleep.settle(awake, repulsion_range_sq)
+            profiler.lap("update")
+
+        energy = physics_state.kinetic_energy() if use_numpy_physics else kinetic_energy(skills)
+        interacting = panning or dragged_skill is not None
+        if use_numpy_physics and physics_worker:
+            interacting = interacting or physics_worker.busy # it may be ahead of the last snapshot
+        pulsing = (active_skill is not None or selected_path is not None or connecting_skill is not None
+                   or bool(selection) or band is not None)
+        settled = is_settled(energy, len(skills))
+        idle = settled and not interacting and not pulsing and not tile_cache.pending and not tree_io.busy
+
+        # The world is static once it has been settled and untouched for two
+        # frames running: nothing then needs to look at every skill, and pan
+        # and zoom are drawn from cached tiles
+        quiet = (settled and dragged_skill is None and not relaid and not (active_skill and active_skill.is_editing)
+                 and not (use_numpy_physics and physics_worker and physics_worker.busy))
+        static = quiet and was_quiet
+        was_quiet, relaid = quiet, False
+        if not static or not scene_index.is_current(skills, connections):
+            scene_index.rebuild(skills, connections)
+        if use_tiles:
+            tile_cache.track(skills, connections, static)
+        tiled, was_tiled = use_tiles and static, tiled
+        view = (zoom, tuple(camera_offset))
+        overlays = (instructions_open, show_render_stats, profiler.enabled, selected_path and selected_path.id,
+                    selected_path and selected_path.version, side_panel.scroll,
+                    tree_io.label if tree_io.busy else None, tree_io.busy and int(tree_io.fraction * 100))
+
+        if tiled:
+            # Everything is recomposed from tiles whenever anything changed;
+            # only the pulsing skills and the link preview are drawn live
+            full_redraw = (not was_tiled or dirty_tracker.full or view != last_view or overlays != last_overlays
+                           or pulsing or was_pulsing or tile_cache.pending)
+            dirty = []
+            if pulsing or show_render_stats:
+                nodes, edges = visible_scene(scene_index, zoom, camera_offset)
+            else:
+                nodes = edges = ()
+            counters = dict(skills=len(skills), edges=len(connections), tiles=len(tile_cache.tiles))
+        else:
+            # Drawing: everything when the view or an overlay changed, otherwise
+            # only the rectangles whose contents changed since the last frame
+            tile_cache.pending = 0
+            nodes, edges = visible_scene(scene_index, zoom, camera_offset)
+            dirty = dirty_tracker.update(nodes, edges, zoom, camera_offset, global_pulsation_time,
+                                         active_skill, selected_path, connecting_skill, selection, band)
+            full_redraw = dirty_tracker.full or was_tiled or view != last_view or overlays != last_overlays
+            if dirty_tracker.edges_changed or was_tiled:
+                edge_layer.stale = True
+            counters = dict(skills=len(skills), edges=len(connections), drawn=len(nodes), lines=len(edges))
+        dirty_tracker.full = False
+        last_view, last_overlays, was_pulsing = view, overlays, pulsing
+        if show_render_stats:
+            render_stats = scene_stats(skills, connections, nodes, edges, zoom)
+            if not full_redraw:
+                dirty.append(pygame.Rect(RENDER_STATS_RECT))
+        if profiler.enabled and not full_redraw and dirty:
+            dirty.append(pygame.Rect(PROFILER_HUD_RECT))
+        profiler.lap("cull")
+
+        if full_redraw or dirty:
+            if tiled:
+                tile_cache.draw(screen, zoom_level, camera_offset, scene_index)
+                profiler.lap("tiles")
+                selected_skills = selected_path.skills if selected_path else ()
+                live = [s for s in nodes if s is active_skill or s in selected_skills or s in selection]
+                draw_scene(screen, live, (), zoom, TileCache.snapped_camera(zoom_level, camera_offset),
+                           global_pulsation_time, active_skill, selected_path, connecting_skill, profiler,
+                           selection=selection, band=band)
+            else:
+                if not full_redraw:
+                    clip = dirty[0].unionall(dirty[1:])
+                    screen.set_clip(clip)
+                    items = dirty_tracker.items
+                    nodes = [s for s in nodes if items[s][0].colliderect(clip)]
 
-                # Repulsion
-                distance = math.sqrt(distance_sq)
-                force = repulsion_strength / distance_sq
-                fx = force * dx / distance
-                fy = force * dy / distance
-                s1.apply_force(-fx, -fy)
-                s2.apply_force(fx, fy)
-
-        # Attraction for connected skills
-        for s1, s2 in connections:
-            dx = s2.x - s1.x
-            dy = s2.y - s1.y
-            distance = math.sqrt(dx*dx + dy*dy)
-            if distance == 0: continue
-
-            displacement = distance - ideal_distance
-            force = attraction_strength * displacement
-            fx = force * dx / distance
-            fy = force * dy / distance
-            s1.apply_force(fx, fy)
-            s2.apply_force(-fx, -fy)
-
-        for skill in skills:
-            skill.update(dt)
-
-        # Drawing
-        screen.fill(DARK_GRAY)
-
-        for s1, s2 in connections:
-            line_color = BLACK
-            if s1.path and s1.path == s2.path:
-                line_color = s1.path.color
-            
-            s1_screen_x = (s1.x - camera_offset[0]) * zoom + WIDTH / 2
-            s1_screen_y = (s1.y - camera_offset[1]) * zoom + HEIGHT / 2
-            s2_screen_x = (s2.x - camera_offset[0]) * zoom + WIDTH / 2
-            s2_screen_y = (s2.y - camera_offset[1]) * zoom + HEIGHT / 2
-            pygame.draw.line(screen, line_color, (int(s1_screen_x), int(s1_screen_y)), (int(s2_screen_x), int(s2_screen_y)), 2)
+                # The edge layer paints the background and all visible edges; the clip keeps the blit partial
+                draw_scene(screen, nodes, edges, zoom, camera_offset, global_pulsation_time,
+                           active_skill, selected_path, connecting_skill, profiler, edge_layer, dirty_tracker.items,
+                           selection, band)
 
-        if connecting_skill:
-            mouse_pos = pygame.mouse.get_pos()
-            temp_line_color = connecting_skill.path.color if connecting_skill.path else RED
-            skill_screen_x = (connecting_skill.x - camera_offset[0]) * zoom + WIDTH / 2
-            skill_screen_y = (connecting_skill.y - camera_offset[1]) * zoom + HEIGHT / 2
-            pygame.draw.line(screen, temp_line_color, (int(skill_screen_x), int(skill_screen_y)), mouse_pos, 2)
-
-        for skill in skills:
-            is_selected = skill == active_skill or (selected_path and skill in selected_path.skills)
-            skill.draw(screen, global_pulsation_time, zoom, camera_offset, is_selected)
-
-        if selected_path:
-            draw_side_panel(screen, selected_path)
-
-        info_font = pygame.font.Font(None, 20)
-        info_panel_width = 250
-        info_panel_padding = 10
-        line_height = info_font.get_linesize()
-
-
-
-        wrapped_instructions = []
-        for instruction in instructions:
-            words = instruction.split(' ')
-            current_line = ""
-            for word in words:
-                test_line = current_line + word + " "
-                if info_font.size(test_line)[0] < (info_panel_width - 2 * info_panel_padding):
-                    current_line = test_line
-                else:
-                    wrapped_instructions.append(current_line.strip())
-                    current_line = word + " "
-            wrapped_instructions.append(current_line.strip())
+            if selected_path:
+                side_panel.draw(screen, selected_path)
 
-        total_info_height = len(wrapped_instructions) * line_height + 2 * info_panel_padding
-        info_panel_rect = pygame.Rect(10, 10, info_panel_width, total_info_height)
-        #pygame.draw.rect(screen, DARK_GRAY, info_panel_rect)
-        #pygame.draw.rect(screen, WHITE, info_panel_rect, 2)
+            instructions_dropdown.draw(screen, instructions_open, pos=(20, 20), width=720)
 
-        
-        
+            if show_render_stats:
+                draw_render_stats(screen, render_stats)
 
-        draw_instructions_dropdown(screen, instructions_open, pos=(20, 20), width=720)
-    
+            if profiler.enabled:
+                draw_profiler_hud(screen, profiler)
 
-        pygame.display.flip()
+            if tree_io.busy and tree_io.label:
+                draw_progress(screen, tree_io.label, tree_io.fraction)
+            profiler.lap("overlays")
 
+            if full_redraw:
+                pygame.display.flip()
+            else:
+                screen.set_clip(None)
+                pygame.display.update(dirty)
+            profiler.lap("present")
+        profiler.end_frame(**counters)
+
+    if physics_worker:
+        physics_worker.stop()
+    tree_io.wait()
+    journal.compact(skills, paths, connections)
+    journal.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "layout":
+        sys.exit(cli(sys.argv[2:]))
     main()
\ No newline at end of file